@@ -6,14 +6,15 @@ Owner controls all groups from main control group via interactive menu
 """
 
 import os
-import json
-import time
+import sys
+import html
+import random
 import logging
 import asyncio
-import threading
-from typing import Set, Dict, Optional
-from datetime import datetime
+from dataclasses import dataclass
+from typing import Set, Dict, List, Optional, Literal, Tuple
 
+import aiohttp
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, 
@@ -27,7 +28,7 @@ from dotenv import load_dotenv
 
 # Import existing modules
 from fb_scraper import FacebookSearchScraper
-from db_manager import SeenPostsDB
+from db_manager import SeenPostsDB, BotDataDB, BloomFilter
 from url_cleaner import clean_facebook_url, clean_html_entities
 
 # Language detection for English-only filtering
@@ -44,9 +45,14 @@ from config import (
     TELEGRAM_BOT_TOKEN,
     TELEGRAM_OWNER_CHAT_ID,
     CHECK_INTERVAL,
+    SCRAPER_WORKERS,
+    SEARCH_BATCH_SIZE,
     COOKIES_FILE,
     DATA_DIR,
-    SEEN_POSTS_FILE
+    SEEN_POSTS_FILE,
+    SEEN_POSTS_LEGACY_FILE,
+    BOT_DATA_FILE,
+    BOT_DB_FILE
 )
 
 # Load environment variables (for any overrides)
@@ -60,124 +66,199 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def normalize_keyword(keyword: str) -> str:
+    """Canonical (stripped, lowercased, interned) form of a keyword"""
+    return sys.intern(keyword.strip().lower())
+
+
+_HELP_TEXT = """
+<b>Facebook Monitor Bot - Commands</b>
+
+<b>Group Management:</b>
+/group - Interactive menu to manage groups
+/addgroup &lt;group_id&gt; &lt;name&gt; - Add a new client group
+/removegroup &lt;group_id&gt; - Remove a group
+/listgroups - List all monitored groups
+
+<b>Quick Commands:</b>
+/addkeyword &lt;group_id&gt; &lt;keyword&gt; - Add keyword directly
+/removekeyword &lt;group_id&gt; &lt;keyword&gt; - Remove keyword directly
+/listkeywords &lt;group_id&gt; - List keywords for a group
+
+<b>Status:</b>
+/status - Show bot status
+/help - Show this help
+
+<b>Note:</b> Use the /group menu for easier management!
+"""
+
+
+@dataclass(slots=True)
+class UserState:
+    """Pending keyword input for a user: which flow they are in and for which group"""
+    mode: Literal['add', 'remove']
+    group_id: int
+
+
 class FacebookTelegramBot:
     def __init__(self):
         # Load configuration from config.py (which reads from env with fallbacks)
         self.telegram_token = TELEGRAM_BOT_TOKEN
+        self._send_url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
         self.owner_chat_id = int(TELEGRAM_OWNER_CHAT_ID)
         
         # Timing settings
         self.check_interval = CHECK_INTERVAL
         self.cookies_file = COOKIES_FILE
+        self.seen_cleanup_every = 30  # cycles between seen-posts expiry passes (~1h at 120s)
+        self.interval_jitter = 0.3  # cycle sleep is check_interval * uniform(1 - j, 1 + j)
+        self.keyword_delay_range = (2.0, 8.0)  # think-time between searches on one browser
+        self.poll_timeout = 30  # getUpdates long-poll timeout (Telegram allows up to ~50s)
         
         # Multi-group data storage
         # group_id -> {name: str, keywords: set, enabled: bool}
         self.groups: Dict[int, Dict] = {}
-        self.processed_items: Dict[int, Set[str]] = {}  # group_id -> set of processed post IDs
+        self.processed_items: Dict[int, BloomFilter] = {}  # group_id -> Bloom filter of processed post IDs
+        self._processed_dirty: Set[int] = set()  # groups whose filter changed since the last save
         
         # Track which keywords have been initialized (sent initial batch)
-        # Format: "group_id:keyword" -> True
-        self.initialized_keywords: Set[str] = set()
+        # Format: (group_id, keyword)
+        self.initialized_keywords: Set[Tuple[int, str]] = set()
         
         # Number of posts to send on first keyword addition
         self.initial_backfill_count = 10
         
         # Menu state tracking for interactive flows
-        self.pending_keyword_add: Dict[int, int] = {}  # user_id -> group_id
-        self.pending_keyword_remove: Dict[int, int] = {}  # user_id -> group_id
-        self.menu_state: Dict[int, str] = {}  # user_id -> current state
+        self.user_state: Dict[int, UserState] = {}  # user_id -> pending keyword input
+        
+        # Pre-built inline keyboards, invalidated whenever a group changes
+        self._menu_cache: Dict[tuple, InlineKeyboardMarkup] = {}
+        
+        # callback_data action -> handler; group actions get (query, user_id, group_id, group_info)
+        self._cb_dispatch = {
+            'manage_group': self._cb_manage,
+            'add_kw': self._cb_add_keywords,
+            'remove_kw': self._cb_remove_keywords,
+            'list_kw': self._cb_list_keywords,
+            'clear_kw': self._cb_clear_keywords,
+            'confirm_clear': self._cb_confirm_clear,
+            'toggle': self._cb_toggle,
+            'back_to_groups': self._cb_back_to_groups,
+        }
+        # group_id -> ((name, enabled, keyword count), button); survives _groups_changed()
+        self._group_buttons: Dict[int, tuple] = {}
+        # Inverted index: keyword -> enabled group_ids subscribed to it, kept in sync on mutation
+        self.keyword_to_groups: Dict[str, Set[int]] = {}
+        # (total keywords, enabled groups) for /status, built lazily by _status_counts()
+        self._status_cache: Optional[Tuple[int, int]] = None
+        # group_id -> keywords sorted for display, built lazily by _sorted_keywords()
+        self._sorted_keywords_cache: Dict[int, Tuple[str, ...]] = {}
         
         # Data directory
         self.data_dir = DATA_DIR
         os.makedirs(self.data_dir, exist_ok=True)
-        self.data_file = os.path.join(self.data_dir, 'bot_data.json')
+        self.data_file = BOT_DATA_FILE
+        self.db_file = BOT_DB_FILE
         self.seen_posts_file = SEEN_POSTS_FILE
+        self.seen_posts_legacy_file = SEEN_POSTS_LEGACY_FILE
+        
+        # SQLite store - every mutation writes only the rows it touches
+        self.store = BotDataDB(self.db_file, legacy_json=self.data_file)
+        
+        # Debounced commits from the async handlers
+        self.save_debounce = 0.5  # seconds
+        self._save_pending = False
+        self._save_task: Optional[asyncio.Task] = None
         
-        # Facebook scraper (initialized in monitoring thread)
-        self.scraper: Optional[FacebookSearchScraper] = None
+        # Facebook scrapers, one browser each (initialized by the monitoring task)
+        self.scraper_workers = SCRAPER_WORKERS
+        self.search_batch_size = SEARCH_BATCH_SIZE
+        self.scrapers: List[FacebookSearchScraper] = []
         self.seen_db: Optional[SeenPostsDB] = None
         
+        # aiohttp session for alerts, opened in post_init and closed in post_shutdown
+        self._http_session = None
+        
+        # Alert throughput: at most alert_concurrency sends per alert_interval seconds
+        # (20/s stays under Telegram's ~30 msg/s bot limit), and one send at a time per
+        # chat spaced chat_alert_interval apart (groups allow ~20 msg/min, private chats ~1/s)
+        self.alert_concurrency = 20
+        self.alert_interval = 1.0
+        self.chat_alert_interval = 1.0
+        self.group_alert_interval = 3.0
+        self.alert_attempts = 3
+        self._alert_semaphore = asyncio.Semaphore(self.alert_concurrency)
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        
         # Control flags
         self.running = False
-        self.monitor_thread: Optional[threading.Thread] = None
+        self.monitor_task: Optional[asyncio.Task] = None
         
         # Load existing data
         self.load_data()
     
     def load_data(self):
-        """Load groups and processed items from file"""
+        """Load groups, processed items and initialized keywords from the database"""
         try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                
-                # Load groups with keywords as sets
-                groups_data = data.get('groups', {})
-                self.groups = {}
-                for group_id_str, group_info in groups_data.items():
-                    group_id = int(group_id_str)
-                    self.groups[group_id] = {
-                        'name': group_info.get('name', f'Group {group_id}'),
-                        'keywords': set(group_info.get('keywords', [])),
-                        'enabled': group_info.get('enabled', True)
-                    }
-                
-                # Load processed items per group
-                processed_data = data.get('processed_items', {})
-                self.processed_items = {}
-                for group_id_str, items in processed_data.items():
-                    self.processed_items[int(group_id_str)] = set(items)
-                
-                # Load initialized keywords
-                self.initialized_keywords = set(data.get('initialized_keywords', []))
-                
+            self.groups = self.store.load_groups()
+            for group_id, group_info in self.groups.items():
+                stored = group_info['keywords']
+                canonical = {normalize_keyword(kw) for kw in stored if kw.strip()}
+                if canonical != stored:
+                    # Rewrite keywords saved before canonicalization
+                    self.store.clear_keywords(group_id)
+                    self.store.add_keywords(group_id, canonical)
+                group_info['keywords'] = canonical
+            self.processed_items = self.store.load_processed_items()
+            self.initialized_keywords = {
+                (group_id, normalize_keyword(keyword)) for group_id, keyword in self.store.load_initialized()
+            }
+            
+            if self.groups:
                 total_keywords = sum(len(g['keywords']) for g in self.groups.values())
                 logger.info(f"Loaded {len(self.groups)} groups with {total_keywords} total keywords")
             else:
                 logger.info("No existing data found, starting fresh")
-                self.groups = {}
-                self.processed_items = {}
                 
         except Exception as e:
             logger.error(f"Error loading data: {e}")
             self.groups = {}
             self.processed_items = {}
+        
+        self._rebuild_keyword_index()
     
     def save_data(self):
-        """Save groups and processed items to file"""
+        """Commit pending database writes"""
         try:
-            # Trim processed items if too large
-            for group_id in list(self.processed_items.keys()):
-                if len(self.processed_items[group_id]) > 5000:
-                    self.processed_items[group_id] = set(list(self.processed_items[group_id])[-2500:])
-            
-            # Convert to JSON-serializable format
-            groups_data = {}
-            for group_id, group_info in self.groups.items():
-                groups_data[str(group_id)] = {
-                    'name': group_info['name'],
-                    'keywords': list(group_info['keywords']),
-                    'enabled': group_info['enabled']
-                }
-            
-            processed_data = {}
-            for group_id, items in self.processed_items.items():
-                processed_data[str(group_id)] = list(items)
-            
-            data = {
-                'groups': groups_data,
-                'processed_items': processed_data,
-                'initialized_keywords': list(self.initialized_keywords)
-            }
-            
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            
+            self.store.commit()
             logger.debug("Data saved successfully")
-            
         except Exception as e:
             logger.error(f"Error saving data: {e}")
     
+    def _schedule_save(self):
+        """Schedule a debounced save so bursts of mutations produce a single commit"""
+        self._save_pending = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._debounced_save())
+    
+    async def _debounced_save(self):
+        """Wait for the burst to settle, then commit off the event loop"""
+        while self._save_pending:
+            await asyncio.sleep(self.save_debounce)
+            self._save_pending = False
+            await asyncio.to_thread(self.save_data)
+    
+    def save_processed_items(self):
+        """Persist the Bloom filters that changed since the last save"""
+        try:
+            for group_id in self._processed_dirty:
+                bloom = self.processed_items.get(group_id)
+                if bloom is not None:
+                    self.store.save_processed(group_id, bloom)
+            self._processed_dirty.clear()
+        except Exception as e:
+            logger.error(f"Error saving processed items: {e}")
+    
     def is_owner(self, chat_id: int) -> bool:
         """Check if the chat is the owner's control group"""
         return chat_id == self.owner_chat_id
@@ -216,27 +297,7 @@ class FacebookTelegramBot:
             await update.message.reply_text("Commands are only available in the control group.")
             return
         
-        help_text = """
-<b>Facebook Monitor Bot - Commands</b>
-
-<b>Group Management:</b>
-/group - Interactive menu to manage groups
-/addgroup &lt;group_id&gt; &lt;name&gt; - Add a new client group
-/removegroup &lt;group_id&gt; - Remove a group
-/listgroups - List all monitored groups
-
-<b>Quick Commands:</b>
-/addkeyword &lt;group_id&gt; &lt;keyword&gt; - Add keyword directly
-/removekeyword &lt;group_id&gt; &lt;keyword&gt; - Remove keyword directly
-/listkeywords &lt;group_id&gt; - List keywords for a group
-
-<b>Status:</b>
-/status - Show bot status
-/help - Show this help
-
-<b>Note:</b> Use the /group menu for easier management!
-"""
-        await update.message.reply_text(help_text, parse_mode='HTML')
+        await update.message.reply_text(_HELP_TEXT, parse_mode='HTML')
     
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show bot status"""
@@ -246,8 +307,7 @@ class FacebookTelegramBot:
             await update.message.reply_text("Commands are only available in the control group.")
             return
         
-        total_keywords = sum(len(g['keywords']) for g in self.groups.values())
-        enabled_groups = sum(1 for g in self.groups.values() if g['enabled'])
+        total_keywords, enabled_groups = self._status_counts()
         
         status_text = f"""
 <b>Facebook Monitor Status</b>
@@ -318,8 +378,10 @@ class FacebookTelegramBot:
                 'keywords': set(),
                 'enabled': True
             }
-            self.processed_items[group_id] = set()
-            self.save_data()
+            self.processed_items[group_id] = BloomFilter()
+            self.store.add_group(group_id, group_name)
+            self._groups_changed()
+            self._schedule_save()
             
             await update.message.reply_text(
                 f"✅ Added group: <b>{group_name}</b>\n"
@@ -355,10 +417,13 @@ class FacebookTelegramBot:
                 return
             
             group_name = self.groups[group_id]['name']
+            self._unindex_keywords(group_id, self.groups[group_id]['keywords'])
             del self.groups[group_id]
             if group_id in self.processed_items:
                 del self.processed_items[group_id]
-            self.save_data()
+            self.store.remove_group(group_id)
+            self._groups_changed()
+            self._schedule_save()
             
             await update.message.reply_text(f"✅ Removed group: {group_name}")
             
@@ -391,6 +456,90 @@ class FacebookTelegramBot:
     # INTERACTIVE MENU SYSTEM
     # =========================================================================
     
+    def _groups_changed(self):
+        """Invalidate everything derived from self.groups"""
+        self._menu_cache.clear()
+        self._status_cache = None
+        self._sorted_keywords_cache.clear()
+    
+    def _sorted_keywords(self, group_id: int) -> Tuple[str, ...]:
+        """A group's keywords in display order, cached until a group changes"""
+        cached = self._sorted_keywords_cache.get(group_id)
+        if cached is None:
+            cached = self._sorted_keywords_cache[group_id] = tuple(sorted(self.groups[group_id]['keywords']))
+        return cached
+    
+    def _status_counts(self) -> Tuple[int, int]:
+        """(total keywords, enabled groups), cached until a group changes"""
+        if self._status_cache is None:
+            total_keywords = sum(len(g['keywords']) for g in self.groups.values())
+            enabled_groups = sum(1 for g in self.groups.values() if g['enabled'])
+            self._status_cache = (total_keywords, enabled_groups)
+        return self._status_cache
+    
+    def _rebuild_keyword_index(self):
+        """Build keyword_to_groups from scratch (only needed after loading data)"""
+        self.keyword_to_groups = {}
+        for group_id in self.groups:
+            self._index_keywords(group_id, self.groups[group_id]['keywords'])
+    
+    def _index_keywords(self, group_id: int, keywords):
+        """Subscribe a group to keywords in the inverted index (no-op while it is disabled)"""
+        if not self.groups[group_id]['enabled']:
+            return
+        for keyword in keywords:
+            self.keyword_to_groups.setdefault(keyword, set()).add(group_id)
+    
+    def _unindex_keywords(self, group_id: int, keywords):
+        """Unsubscribe a group from keywords, dropping keywords nobody wants any more"""
+        for keyword in keywords:
+            group_ids = self.keyword_to_groups.get(keyword)
+            if group_ids is None:
+                continue
+            group_ids.discard(group_id)
+            if not group_ids:
+                del self.keyword_to_groups[keyword]
+    
+    def _build_group_list_markup(self) -> InlineKeyboardMarkup:
+        """Keyboard listing every group, cached until a group changes"""
+        markup = self._menu_cache.get(('groups',))
+        if markup is None:
+            buttons = {group_id: self._group_button(group_id, group_info)
+                       for group_id, group_info in self.groups.items()}
+            self._group_buttons = buttons  # drops entries for removed groups
+            keyboard = [[button] for _, button in buttons.values()]
+            markup = self._menu_cache[('groups',)] = InlineKeyboardMarkup(keyboard)
+        return markup
+    
+    def _group_button(self, group_id: int, group_info: dict) -> tuple:
+        """(signature, button) for one group, rebuilt only when its label would change"""
+        signature = (group_info['name'], group_info['enabled'], len(group_info['keywords']))
+        cached = self._group_buttons.get(group_id)
+        if cached is not None and cached[0] == signature:
+            return cached
+        name, enabled, keyword_count = signature
+        status_icon = "✓" if enabled else "✗"
+        button_text = f"{status_icon} {name} ({keyword_count} kw)"
+        return signature, InlineKeyboardButton(button_text, callback_data=f"manage_group:{group_id}")
+    
+    def _build_manage_markup(self, group_id: int) -> InlineKeyboardMarkup:
+        """Management keyboard for one group, cached per (group_id, enabled)"""
+        enabled = self.groups[group_id]['enabled']
+        key = ('manage', group_id, enabled)
+        markup = self._menu_cache.get(key)
+        if markup is None:
+            status = "Enabled" if enabled else "Disabled"
+            keyboard = [
+                [InlineKeyboardButton("➕ Add Keywords", callback_data=f"add_kw:{group_id}")],
+                [InlineKeyboardButton("➖ Remove Keywords", callback_data=f"remove_kw:{group_id}")],
+                [InlineKeyboardButton("📋 List Keywords", callback_data=f"list_kw:{group_id}")],
+                [InlineKeyboardButton("🗑️ Clear All Keywords", callback_data=f"clear_kw:{group_id}")],
+                [InlineKeyboardButton(f"🔄 Toggle ({status})", callback_data=f"toggle:{group_id}")],
+                [InlineKeyboardButton("« Back to Groups", callback_data="back_to_groups")]
+            ]
+            markup = self._menu_cache[key] = InlineKeyboardMarkup(keyboard)
+        return markup
+    
     async def group_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show interactive group selection menu"""
         chat_id = update.effective_chat.id
@@ -406,233 +555,213 @@ class FacebookTelegramBot:
             )
             return
         
-        # Create inline keyboard with all groups
-        keyboard = []
-        for group_id, group_info in self.groups.items():
-            keyword_count = len(group_info['keywords'])
-            status_icon = "✓" if group_info['enabled'] else "✗"
-            button_text = f"{status_icon} {group_info['name']} ({keyword_count} kw)"
-            keyboard.append([InlineKeyboardButton(button_text, callback_data=f"manage_group:{group_id}")])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = self._build_group_list_markup()
         await update.message.reply_text("Select a group to manage:", reply_markup=reply_markup)
     
+    @staticmethod
+    async def _answer_and_edit(query, *args, **kwargs):
+        """Answer the callback and edit its message concurrently (one round-trip of latency)"""
+        await asyncio.gather(query.answer(), query.edit_message_text(*args, **kwargs))
+    
     async def group_callback_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle all menu interactions"""
         query = update.callback_query
-        await query.answer()
-        
         user_id = query.from_user.id
-        data = query.data
         
-        # =====================================================================
-        # GROUP MANAGEMENT MENU
-        # =====================================================================
-        if data.startswith("manage_group:"):
-            try:
-                group_id = int(data.split(":")[1])
-                
-                if group_id not in self.groups:
-                    await query.edit_message_text("Group not found.")
-                    return
-                
-                group_info = self.groups[group_id]
-                keyword_count = len(group_info['keywords'])
-                status = "Enabled" if group_info['enabled'] else "Disabled"
-                
-                # Build management menu
-                keyboard = [
-                    [InlineKeyboardButton("➕ Add Keywords", callback_data=f"add_kw:{group_id}")],
-                    [InlineKeyboardButton("➖ Remove Keywords", callback_data=f"remove_kw:{group_id}")],
-                    [InlineKeyboardButton("📋 List Keywords", callback_data=f"list_kw:{group_id}")],
-                    [InlineKeyboardButton("🗑️ Clear All Keywords", callback_data=f"clear_kw:{group_id}")],
-                    [InlineKeyboardButton(f"🔄 Toggle ({status})", callback_data=f"toggle:{group_id}")],
-                    [InlineKeyboardButton("« Back to Groups", callback_data="back_to_groups")]
-                ]
-                
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                message = f"<b>Managing: {group_info['name']}</b>\n\n"
-                message += f"Status: {status}\n"
-                message += f"Keywords: {keyword_count}\n"
-                message += f"ID: <code>{group_id}</code>"
-                
-                await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='HTML')
-                
-            except (ValueError, IndexError) as e:
-                logger.error(f"Error parsing callback data: {e}")
-                await query.edit_message_text("Error processing selection.")
+        # callback_data is "<action>" or "<action>:<group_id>"
+        action, _, arg = query.data.partition(':')
+        handler = self._cb_dispatch.get(action)
+        if handler is None:
+            await query.answer()
+            return
         
-        # =====================================================================
-        # ADD KEYWORDS FLOW
-        # =====================================================================
-        elif data.startswith("add_kw:"):
-            group_id = int(data.split(":")[1])
-            self.pending_keyword_add[user_id] = group_id
-            self.menu_state[user_id] = "adding_keywords"
-            
-            group_name = self.groups[group_id]['name']
-            current_keywords = self.groups[group_id]['keywords']
-            keywords_text = ", ".join(sorted(current_keywords)) if current_keywords else "None"
-            
-            keyboard = [[InlineKeyboardButton("« Cancel", callback_data=f"manage_group:{group_id}")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                f"<b>Adding keywords to: {group_name}</b>\n\n"
-                f"Current keywords:\n<code>{keywords_text}</code>\n\n"
-                f"Send keywords separated by commas:\n"
-                f"Example: <code>vpn, iphone, tech news</code>",
-                reply_markup=reply_markup,
-                parse_mode='HTML'
-            )
+        if not arg:
+            await handler(query, user_id)
+            return
         
-        # =====================================================================
-        # REMOVE KEYWORDS FLOW
-        # =====================================================================
-        elif data.startswith("remove_kw:"):
-            group_id = int(data.split(":")[1])
-            
-            if not self.groups[group_id]['keywords']:
-                keyboard = [[InlineKeyboardButton("« Back", callback_data=f"manage_group:{group_id}")]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text(
-                    f"No keywords to remove from {self.groups[group_id]['name']}",
-                    reply_markup=reply_markup
-                )
-                return
-            
-            self.pending_keyword_remove[user_id] = group_id
-            self.menu_state[user_id] = "removing_keywords"
-            
-            group_name = self.groups[group_id]['name']
-            current_keywords = sorted(self.groups[group_id]['keywords'])
-            keywords_text = ", ".join(current_keywords)
-            
-            keyboard = [[InlineKeyboardButton("« Cancel", callback_data=f"manage_group:{group_id}")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                f"<b>Removing keywords from: {group_name}</b>\n\n"
-                f"Current keywords:\n<code>{keywords_text}</code>\n\n"
-                f"Send keywords to remove (comma-separated):",
-                reply_markup=reply_markup,
-                parse_mode='HTML'
-            )
+        try:
+            group_id = int(arg)
+        except ValueError as e:
+            logger.error(f"Error parsing callback data: {e}")
+            await self._answer_and_edit(query, "Error processing selection.")
+            return
         
-        # =====================================================================
-        # LIST KEYWORDS
-        # =====================================================================
-        elif data.startswith("list_kw:"):
-            group_id = int(data.split(":")[1])
-            group_info = self.groups[group_id]
-            
-            keywords = sorted(group_info['keywords'])
-            if keywords:
-                keywords_text = "\n".join(f"• {kw}" for kw in keywords)
-            else:
-                keywords_text = "No keywords configured."
-            
-            keyboard = [[InlineKeyboardButton("« Back", callback_data=f"manage_group:{group_id}")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                f"<b>Keywords for: {group_info['name']}</b>\n\n{keywords_text}",
-                reply_markup=reply_markup,
-                parse_mode='HTML'
-            )
+        gi = self.groups.get(group_id)
+        if gi is None:
+            await self._answer_and_edit(query, "Group not found.")
+            return
         
-        # =====================================================================
-        # CLEAR ALL KEYWORDS
-        # =====================================================================
-        elif data.startswith("clear_kw:"):
-            group_id = int(data.split(":")[1])
-            
-            keyboard = [
-                [InlineKeyboardButton("⚠️ Yes, Clear All", callback_data=f"confirm_clear:{group_id}")],
-                [InlineKeyboardButton("« Cancel", callback_data=f"manage_group:{group_id}")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                f"⚠️ Are you sure you want to clear ALL keywords from {self.groups[group_id]['name']}?",
-                reply_markup=reply_markup
-            )
+        await handler(query, user_id, group_id, gi)
+    
+    # =====================================================================
+    # GROUP MANAGEMENT MENU
+    # =====================================================================
+    
+    async def _cb_manage(self, query, user_id: int, group_id: int, gi: dict):
+        keyword_count = len(gi['keywords'])
+        status = "Enabled" if gi['enabled'] else "Disabled"
         
-        elif data.startswith("confirm_clear:"):
-            group_id = int(data.split(":")[1])
-            group_name = self.groups[group_id]['name']
-            count = len(self.groups[group_id]['keywords'])
-            
-            self.groups[group_id]['keywords'] = set()
-            self.save_data()
-            
-            keyboard = [[InlineKeyboardButton("« Back to Group", callback_data=f"manage_group:{group_id}")]]
+        reply_markup = self._build_manage_markup(group_id)
+        message = f"<b>Managing: {gi['name']}</b>\n\n"
+        message += f"Status: {status}\n"
+        message += f"Keywords: {keyword_count}\n"
+        message += f"ID: <code>{group_id}</code>"
+        
+        await self._answer_and_edit(query, message, reply_markup=reply_markup, parse_mode='HTML')
+    
+    # =====================================================================
+    # ADD KEYWORDS FLOW
+    # =====================================================================
+    
+    async def _cb_add_keywords(self, query, user_id: int, group_id: int, gi: dict):
+        self.user_state[user_id] = UserState('add', group_id)
+        
+        current_keywords = self._sorted_keywords(group_id)
+        keywords_text = ", ".join(current_keywords) if current_keywords else "None"
+        
+        keyboard = [[InlineKeyboardButton("« Cancel", callback_data=f"manage_group:{group_id}")]]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        await self._answer_and_edit(
+            query,
+            f"<b>Adding keywords to: {gi['name']}</b>\n\n"
+            f"Current keywords:\n<code>{keywords_text}</code>\n\n"
+            f"Send keywords separated by commas:\n"
+            f"Example: <code>vpn, iphone, tech news</code>",
+            reply_markup=reply_markup,
+            parse_mode='HTML'
+        )
+    
+    # =====================================================================
+    # REMOVE KEYWORDS FLOW
+    # =====================================================================
+    
+    async def _cb_remove_keywords(self, query, user_id: int, group_id: int, gi: dict):
+        if not gi['keywords']:
+            keyboard = [[InlineKeyboardButton("« Back", callback_data=f"manage_group:{group_id}")]]
             reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                f"✅ Cleared {count} keywords from {group_name}",
+            await self._answer_and_edit(
+                query,
+                f"No keywords to remove from {gi['name']}",
                 reply_markup=reply_markup
             )
+            return
         
-        # =====================================================================
-        # TOGGLE GROUP
-        # =====================================================================
-        elif data.startswith("toggle:"):
-            group_id = int(data.split(":")[1])
-            
-            self.groups[group_id]['enabled'] = not self.groups[group_id]['enabled']
-            self.save_data()
-            
-            new_status = "enabled" if self.groups[group_id]['enabled'] else "disabled"
-            
-            # Refresh the menu
-            group_info = self.groups[group_id]
-            keyword_count = len(group_info['keywords'])
-            status = "Enabled" if group_info['enabled'] else "Disabled"
-            
-            keyboard = [
-                [InlineKeyboardButton("➕ Add Keywords", callback_data=f"add_kw:{group_id}")],
-                [InlineKeyboardButton("➖ Remove Keywords", callback_data=f"remove_kw:{group_id}")],
-                [InlineKeyboardButton("📋 List Keywords", callback_data=f"list_kw:{group_id}")],
-                [InlineKeyboardButton("🗑️ Clear All Keywords", callback_data=f"clear_kw:{group_id}")],
-                [InlineKeyboardButton(f"🔄 Toggle ({status})", callback_data=f"toggle:{group_id}")],
-                [InlineKeyboardButton("« Back to Groups", callback_data="back_to_groups")]
-            ]
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            message = f"<b>Managing: {group_info['name']}</b>\n\n"
-            message += f"Status: {status} ✅\n"
-            message += f"Keywords: {keyword_count}\n"
-            message += f"ID: <code>{group_id}</code>\n\n"
-            message += f"<i>Group {new_status}!</i>"
-            
-            await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='HTML')
+        self.user_state[user_id] = UserState('remove', group_id)
         
-        # =====================================================================
-        # BACK TO GROUPS
-        # =====================================================================
-        elif data == "back_to_groups":
-            # Clear any pending states
-            if user_id in self.pending_keyword_add:
-                del self.pending_keyword_add[user_id]
-            if user_id in self.pending_keyword_remove:
-                del self.pending_keyword_remove[user_id]
-            if user_id in self.menu_state:
-                del self.menu_state[user_id]
-            
-            if not self.groups:
-                await query.edit_message_text("No groups configured.")
-                return
-            
-            keyboard = []
-            for group_id, group_info in self.groups.items():
-                keyword_count = len(group_info['keywords'])
-                status_icon = "✓" if group_info['enabled'] else "✗"
-                button_text = f"{status_icon} {group_info['name']} ({keyword_count} kw)"
-                keyboard.append([InlineKeyboardButton(button_text, callback_data=f"manage_group:{group_id}")])
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text("Select a group to manage:", reply_markup=reply_markup)
+        keywords_text = ", ".join(self._sorted_keywords(group_id))
+        
+        keyboard = [[InlineKeyboardButton("« Cancel", callback_data=f"manage_group:{group_id}")]]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        await self._answer_and_edit(
+            query,
+            f"<b>Removing keywords from: {gi['name']}</b>\n\n"
+            f"Current keywords:\n<code>{keywords_text}</code>\n\n"
+            f"Send keywords to remove (comma-separated):",
+            reply_markup=reply_markup,
+            parse_mode='HTML'
+        )
+    
+    # =====================================================================
+    # LIST KEYWORDS
+    # =====================================================================
+    
+    async def _cb_list_keywords(self, query, user_id: int, group_id: int, gi: dict):
+        keywords = self._sorted_keywords(group_id)
+        if keywords:
+            keywords_text = "\n".join("• " + kw for kw in keywords)
+        else:
+            keywords_text = "No keywords configured."
+        
+        keyboard = [[InlineKeyboardButton("« Back", callback_data=f"manage_group:{group_id}")]]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        await self._answer_and_edit(
+            query,
+            f"<b>Keywords for: {gi['name']}</b>\n\n{keywords_text}",
+            reply_markup=reply_markup,
+            parse_mode='HTML'
+        )
+    
+    # =====================================================================
+    # CLEAR ALL KEYWORDS
+    # =====================================================================
+    
+    async def _cb_clear_keywords(self, query, user_id: int, group_id: int, gi: dict):
+        keyboard = [
+            [InlineKeyboardButton("⚠️ Yes, Clear All", callback_data=f"confirm_clear:{group_id}")],
+            [InlineKeyboardButton("« Cancel", callback_data=f"manage_group:{group_id}")]
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        await self._answer_and_edit(
+            query,
+            f"⚠️ Are you sure you want to clear ALL keywords from {gi['name']}?",
+            reply_markup=reply_markup
+        )
+    
+    async def _cb_confirm_clear(self, query, user_id: int, group_id: int, gi: dict):
+        count = len(gi['keywords'])
+        
+        self._unindex_keywords(group_id, gi['keywords'])
+        gi['keywords'] = set()
+        self.store.clear_keywords(group_id)
+        self._groups_changed()
+        self._schedule_save()
+        
+        keyboard = [[InlineKeyboardButton("« Back to Group", callback_data=f"manage_group:{group_id}")]]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        await self._answer_and_edit(
+            query,
+            f"✅ Cleared {count} keywords from {gi['name']}",
+            reply_markup=reply_markup
+        )
+    
+    # =====================================================================
+    # TOGGLE GROUP
+    # =====================================================================
+    
+    async def _cb_toggle(self, query, user_id: int, group_id: int, gi: dict):
+        enabled = gi['enabled'] = not gi['enabled']
+        if enabled:
+            self._index_keywords(group_id, gi['keywords'])
+        else:
+            self._unindex_keywords(group_id, gi['keywords'])
+        self.store.set_group_enabled(group_id, enabled)
+        self._groups_changed()
+        self._schedule_save()
+        
+        new_status = "enabled" if enabled else "disabled"
+        
+        # Refresh the menu
+        keyword_count = len(gi['keywords'])
+        status = "Enabled" if enabled else "Disabled"
+        
+        reply_markup = self._build_manage_markup(group_id)
+        message = f"<b>Managing: {gi['name']}</b>\n\n"
+        message += f"Status: {status} ✅\n"
+        message += f"Keywords: {keyword_count}\n"
+        message += f"ID: <code>{group_id}</code>\n\n"
+        message += f"<i>Group {new_status}!</i>"
+        
+        await self._answer_and_edit(query, message, reply_markup=reply_markup, parse_mode='HTML')
+    
+    # =====================================================================
+    # BACK TO GROUPS
+    # =====================================================================
+    
+    async def _cb_back_to_groups(self, query, user_id: int):
+        # Clear any pending state
+        self.user_state.pop(user_id, None)
+        
+        if not self.groups:
+            await self._answer_and_edit(query, "No groups configured.")
+            return
+        
+        reply_markup = self._build_group_list_markup()
+        await self._answer_and_edit(query, "Select a group to manage:", reply_markup=reply_markup)
     
     # =========================================================================
     # MESSAGE HANDLER (for keyword input after menu selection)
@@ -655,21 +784,23 @@ class FacebookTelegramBot:
         if text.startswith('/'):
             return
         
+        state = self.user_state.get(user_id)
+        if state is None:
+            return
+        
         # =====================================================================
         # ADDING KEYWORDS
         # =====================================================================
-        if user_id in self.pending_keyword_add:
-            group_id = self.pending_keyword_add[user_id]
+        if state.mode == 'add':
+            group_id = state.group_id
             
             if group_id not in self.groups:
                 await update.message.reply_text("Group no longer exists.")
-                del self.pending_keyword_add[user_id]
-                if user_id in self.menu_state:
-                    del self.menu_state[user_id]
+                self.user_state.pop(user_id, None)
                 return
             
             # Parse comma-separated keywords
-            keywords = [kw.strip().lower() for kw in text.split(',') if kw.strip()]
+            keywords = [normalize_keyword(kw) for kw in text.split(',') if kw.strip()]
             
             if not keywords:
                 await update.message.reply_text("No valid keywords found. Try again.")
@@ -682,12 +813,14 @@ class FacebookTelegramBot:
                     self.groups[group_id]['keywords'].add(kw)
                     added.append(kw)
             
-            self.save_data()
+            if added:
+                self.store.add_keywords(group_id, added)
+                self._index_keywords(group_id, added)
+                self._groups_changed()
+                self._schedule_save()
             
             # Clear pending state
-            del self.pending_keyword_add[user_id]
-            if user_id in self.menu_state:
-                del self.menu_state[user_id]
+            self.user_state.pop(user_id, None)
             
             group_name = self.groups[group_id]['name']
             
@@ -711,18 +844,16 @@ class FacebookTelegramBot:
         # =====================================================================
         # REMOVING KEYWORDS
         # =====================================================================
-        elif user_id in self.pending_keyword_remove:
-            group_id = self.pending_keyword_remove[user_id]
+        elif state.mode == 'remove':
+            group_id = state.group_id
             
             if group_id not in self.groups:
                 await update.message.reply_text("Group no longer exists.")
-                del self.pending_keyword_remove[user_id]
-                if user_id in self.menu_state:
-                    del self.menu_state[user_id]
+                self.user_state.pop(user_id, None)
                 return
             
             # Parse comma-separated keywords
-            keywords = [kw.strip().lower() for kw in text.split(',') if kw.strip()]
+            keywords = [normalize_keyword(kw) for kw in text.split(',') if kw.strip()]
             
             if not keywords:
                 await update.message.reply_text("No valid keywords found. Try again.")
@@ -735,12 +866,14 @@ class FacebookTelegramBot:
                     self.groups[group_id]['keywords'].discard(kw)
                     removed.append(kw)
             
-            self.save_data()
+            if removed:
+                self.store.remove_keywords(group_id, removed)
+                self._unindex_keywords(group_id, removed)
+                self._groups_changed()
+                self._schedule_save()
             
             # Clear pending state
-            del self.pending_keyword_remove[user_id]
-            if user_id in self.menu_state:
-                del self.menu_state[user_id]
+            self.user_state.pop(user_id, None)
             
             group_name = self.groups[group_id]['name']
             
@@ -781,7 +914,7 @@ class FacebookTelegramBot:
         
         try:
             group_id = int(context.args[0])
-            keyword = ' '.join(context.args[1:]).lower().strip()
+            keyword = normalize_keyword(' '.join(context.args[1:]))
             
             if group_id not in self.groups:
                 await update.message.reply_text("Group not found.")
@@ -792,7 +925,10 @@ class FacebookTelegramBot:
                 return
             
             self.groups[group_id]['keywords'].add(keyword)
-            self.save_data()
+            self.store.add_keyword(group_id, keyword)
+            self._index_keywords(group_id, (keyword,))
+            self._groups_changed()
+            self._schedule_save()
             
             await update.message.reply_text(
                 f"✅ Added keyword to {self.groups[group_id]['name']}:\n"
@@ -819,7 +955,7 @@ class FacebookTelegramBot:
         
         try:
             group_id = int(context.args[0])
-            keyword = ' '.join(context.args[1:]).lower().strip()
+            keyword = normalize_keyword(' '.join(context.args[1:]))
             
             if group_id not in self.groups:
                 await update.message.reply_text("Group not found.")
@@ -830,7 +966,10 @@ class FacebookTelegramBot:
                 return
             
             self.groups[group_id]['keywords'].discard(keyword)
-            self.save_data()
+            self.store.remove_keyword(group_id, keyword)
+            self._unindex_keywords(group_id, (keyword,))
+            self._groups_changed()
+            self._schedule_save()
             
             await update.message.reply_text(
                 f"✅ Removed keyword from {self.groups[group_id]['name']}:\n"
@@ -860,10 +999,10 @@ class FacebookTelegramBot:
                 return
             
             group_info = self.groups[group_id]
-            keywords = sorted(group_info['keywords'])
+            keywords = self._sorted_keywords(group_id)
             
             if keywords:
-                keywords_text = "\n".join(f"• {kw}" for kw in keywords)
+                keywords_text = "\n".join("• " + kw for kw in keywords)
                 await update.message.reply_text(
                     f"<b>Keywords for {group_info['name']}:</b>\n\n{keywords_text}",
                     parse_mode='HTML'
@@ -878,224 +1017,327 @@ class FacebookTelegramBot:
     # FACEBOOK MONITORING
     # =========================================================================
     
-    def _log(self, message: str):
-        """Log with timestamp"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] {message}")
+    def _get_http_session(self):
+        """Shared aiohttp session for Telegram API calls (keeps connections alive between alerts)"""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._http_session
     
-    async def send_alert_to_group(self, group_id: int, post: dict, keyword: str):
-        """Send a Facebook post alert to a specific group"""
+    async def send_alert_to_group(self, group_id: int, post: dict, keyword: str) -> Tuple[bool, float]:
+        """
+        Send a Facebook post alert to a specific group.
+        Returns (sent, retry_after); retry_after is Telegram's flood-wait in seconds on a 429, else 0.
+        """
         try:
-            import html
-            
             # Format the message
             text = html.escape(clean_html_entities(str(post.get('text', 'No text'))[:800]))
             
-            message = f"<b>🔔 KEYWORD ALERT</b>\n\n"
-            message += f"<b>Keyword:</b> <code>{keyword}</code>\n\n"
-            message += f"<b>Post:</b>\n<i>{text}</i>\n"
+            # Clean the URL once per post; the same post may be sent to several groups
+            post_url = post.get('post_url_clean')
+            if post_url is None and post.get('post_url'):
+                post_url = post['post_url_clean'] = clean_facebook_url(post['post_url'])
             
-            # Add URL if available
-            post_url = clean_facebook_url(post.get('post_url')) if post.get('post_url') else None
-            if post_url:
-                message += f"\n<a href=\"{post_url}\">View Post</a>"
+            message = "".join((
+                "<b>🔔 KEYWORD ALERT</b>\n\n<b>Keyword:</b> <code>", keyword,
+                "</code>\n\n<b>Post:</b>\n<i>", text, "</i>\n",
+                f"\n<a href=\"{post_url}\">View Post</a>" if post_url else "",
+            ))
             
-            # Send via Telegram API
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
-                url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
-                data = {
-                    'chat_id': group_id,
-                    'text': message,
-                    'parse_mode': 'HTML',
-                    'disable_web_page_preview': True
-                }
-                async with session.post(url, data=data) as response:
-                    if response.status == 200:
-                        logger.info(f"Alert sent to group {group_id} for keyword '{keyword}'")
-                    else:
-                        resp_text = await response.text()
-                        logger.error(f"Failed to send alert: {resp_text}")
+            # Send via Telegram API over the shared session
+            session = self._get_http_session()
+            data = {
+                'chat_id': group_id,
+                'text': message,
+                'parse_mode': 'HTML',
+                'disable_web_page_preview': True
+            }
+            async with session.post(self._send_url, json=data) as response:
+                if response.status == 200:
+                    logger.info(f"Alert sent to group {group_id} for keyword '{keyword}'")
+                    return True, 0.0
+                if response.status == 429:
+                    result = await response.json(content_type=None)
+                    retry_after = float(result.get('parameters', {}).get('retry_after', 1))
+                    logger.warning(f"Rate limited sending to group {group_id}, retrying in {retry_after}s")
+                    return False, retry_after
+                resp_text = await response.text()
+                logger.error(f"Failed to send alert: {resp_text}")
                         
         except Exception as e:
             logger.error(f"Error sending alert to group {group_id}: {e}")
+        return False, 0.0
     
-    def monitoring_loop(self):
-        """Main monitoring loop - runs in a separate thread"""
-        self._log("=== Facebook Monitor Starting ===")
-        self._log(f"Cookies file path: {self.cookies_file}")
-        self._log(f"Cookies file exists: {os.path.exists(self.cookies_file)}")
+    async def _send_throttled(self, group_id: int, post: dict, keyword: str) -> bool:
+        """
+        Send one alert, holding the chat's lock so sends to one chat are spaced out and a
+        global concurrency slot for alert_interval seconds. Retries after Telegram's flood-wait.
+        """
+        chat_lock = self._chat_locks.setdefault(group_id, asyncio.Lock())
+        spacing = self.group_alert_interval if group_id < 0 else self.chat_alert_interval
+        async with chat_lock:
+            for _ in range(self.alert_attempts):
+                async with self._alert_semaphore:
+                    sent, retry_after = await self.send_alert_to_group(group_id, post, keyword)
+                    await asyncio.sleep(self.alert_interval)
+                if sent or not retry_after:
+                    break
+                await asyncio.sleep(retry_after)
+            await asyncio.sleep(max(0.0, spacing - self.alert_interval))
+        return sent
+    
+    async def _dispatch_alerts(self, jobs: List[tuple]):
+        """Send (group_id, post, keyword) alerts concurrently, then record the sent ones as processed"""
+        if not jobs:
+            return
+        results = await asyncio.gather(*(self._send_throttled(*job) for job in jobs))
+        processed_items = self.processed_items
+        dirty = self._processed_dirty
+        for (group_id, post, _), sent in zip(jobs, results):
+            if not sent:
+                continue
+            # The group may have been removed (/removegroup) while the alerts were in flight
+            bloom = processed_items.get(group_id)
+            if bloom is None:
+                continue
+            bloom.add(post['id'])
+            dirty.add(group_id)
+    
+    async def _search_keywords(self, keywords: List[str]):
+        """
+        Search keywords across the scraper pool, yielding (keyword, posts) as each search finishes.
+        Keywords are searched search_batch_size at a time in one OR query; each keyword then
+        gets the posts whose text the scraper tagged with it.
+        """
+        pool: asyncio.Queue = asyncio.Queue()
+        for scraper in self.scrapers:
+            pool.put_nowait(scraper)
+        loop = asyncio.get_running_loop()
         
-        # Initialize scraper with error handling
+        async def search(batch: List[str]):
+            scraper = await pool.get()
+            try:
+                return batch, await asyncio.to_thread(scraper.search_keywords, batch)
+            except Exception as e:
+                logger.error(f"Error searching {', '.join(batch)}: {e}")
+                return batch, None
+            finally:
+                # Randomized think-time before this browser runs its next search
+                loop.call_later(random.uniform(*self.keyword_delay_range), pool.put_nowait, scraper)
+        
+        size = self.search_batch_size
+        batches = [keywords[i:i + size] for i in range(0, len(keywords), size)]
+        tasks = [asyncio.create_task(search(batch)) for batch in batches]
         try:
-            self.scraper = FacebookSearchScraper(self.cookies_file)
-        except FileNotFoundError as e:
-            self._log(f"[ERROR] Cookies file not found: {e}")
-            self._log(f"[ERROR] Please add fb_cookies.json as a Render Secret File")
-            return
-        except Exception as e:
-            self._log(f"[ERROR] Failed to initialize scraper: {e}")
-            import traceback
-            self._log(traceback.format_exc())
-            return
+            for next_done in asyncio.as_completed(tasks):
+                batch, posts = await next_done
+                if posts is None:
+                    continue
+                if len(batch) == 1:
+                    yield batch[0], posts
+                    continue
+                for keyword in batch:
+                    yield keyword, [post for post in posts if keyword in post['keywords']]
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def monitoring_loop(self):
+        """Main monitoring loop - runs as a task on the bot's event loop"""
+        logger.info("=== Facebook Monitor Starting ===")
+        logger.info(f"Cookies file path: {self.cookies_file}")
+        logger.info(f"Cookies file exists: {os.path.exists(self.cookies_file)}")
+        
+        # Initialize scrapers with error handling
+        for slot in range(self.scraper_workers):
+            try:
+                scraper = await asyncio.to_thread(FacebookSearchScraper, self.cookies_file, slot)
+            except FileNotFoundError as e:
+                logger.error(f"Cookies file not found: {e}")
+                logger.error(f"Please add fb_cookies.json as a Render Secret File")
+                return
+            except Exception as e:
+                logger.exception(f"Failed to initialize scraper: {e}")
+                return
+            
+            self.scrapers.append(scraper)
+            if not await asyncio.to_thread(scraper.start_browser):
+                logger.error("Failed to start browser!")
+                self.scrapers.pop()
+                break
         
-        if not self.scraper.start_browser():
-            self._log("[ERROR] Failed to start browser!")
+        if not self.scrapers:
             return
         
-        self.seen_db = SeenPostsDB(self.seen_posts_file, 4)
-        self._log("Browser started successfully")
+        self.seen_db = SeenPostsDB(self.seen_posts_file, 4, legacy_json=self.seen_posts_legacy_file)
+        await asyncio.to_thread(self.seen_db.cleanup_expired)
+        logger.info(f"Started {len(self.scrapers)} browser(s) successfully")
         
+        cycle_count = 0
         while self.running:
             try:
-                self._log("--- Starting check cycle ---")
+                cycle_count += 1
+                if cycle_count % self.seen_cleanup_every == 0:
+                    # Expire old IDs and compact the log
+                    await asyncio.to_thread(self.seen_db.cleanup_expired)
+                
+                logger.info("--- Starting check cycle ---")
                 
-                # Get all unique keywords from enabled groups
-                keyword_to_groups: Dict[str, list] = {}
-                for group_id, group_info in self.groups.items():
-                    if not group_info['enabled']:
-                        continue
-                    for keyword in group_info['keywords']:
-                        if keyword not in keyword_to_groups:
-                            keyword_to_groups[keyword] = []
-                        keyword_to_groups[keyword].append(group_id)
+                # Each unique keyword is searched once and fanned out to its groups
+                keyword_to_groups = self.keyword_to_groups
                 
                 if not keyword_to_groups:
-                    self._log("No keywords configured. Sleeping...")
+                    logger.info("No keywords configured. Sleeping...")
                 else:
-                    self._log(f"Searching {len(keyword_to_groups)} unique keywords")
+                    logger.info(f"Searching {len(keyword_to_groups)} unique keywords")
                     
-                    for keyword, target_groups in keyword_to_groups.items():
-                        if not self.running:
-                            break
-                        
+                    # Snapshot the keywords: handlers may mutate the index while searches run
+                    async for keyword, posts in self._search_keywords(list(keyword_to_groups)):
                         try:
-                            posts = self.scraper.search_keyword(keyword)
+                            # Groups subscribed right now, after the (slow) search returned
+                            target_groups = list(self.keyword_to_groups.get(keyword, ()))
                             
                             if not posts:
-                                self._log(f"No posts for: {keyword}")
+                                logger.info(f"No posts for: {keyword}")
                                 # Mark keyword as initialized even if no posts found
                                 for group_id in target_groups:
-                                    init_key = f"{group_id}:{keyword}"
-                                    self.initialized_keywords.add(init_key)
+                                    init_key = (group_id, keyword)
+                                    if init_key not in self.initialized_keywords:
+                                        self.initialized_keywords.add(init_key)
+                                        self.store.mark_initialized(group_id, keyword)
                                 continue
                             
-                            self._log(f"Found {len(posts)} posts for: {keyword}")
+                            logger.info(f"Found {len(posts)} posts for: {keyword}")
                             
-                            # Process each group separately (for backfill tracking)
+                            # Hoisted for the per-post loop below
+                            initialized = self.initialized_keywords
+                            processed_items = self.processed_items
+                            is_seen = self.seen_db.is_seen
+                            mark_seen = self.seen_db.mark_seen
+                            is_english = self.is_english
+                            backfill_count = self.initial_backfill_count
+                            
+                            # Groups new to this keyword get a backfill of the first posts;
+                            # the rest only get posts nobody has seen before
+                            backfill_groups = []
+                            regular_groups = []
                             for group_id in target_groups:
-                                if group_id not in self.processed_items:
-                                    self.processed_items[group_id] = set()
+                                if group_id not in processed_items:
+                                    processed_items[group_id] = BloomFilter()
+                                if (group_id, keyword) in initialized:
+                                    regular_groups.append(group_id)
+                                else:
+                                    backfill_groups.append(group_id)
+                                    logger.info(f"  [BACKFILL] New keyword '{keyword}' for group {group_id}, sending up to {backfill_count} posts")
+                            
+                            # Walk the posts once: decide new/backfill, mark seen once, fan out to groups
+                            jobs = []  # (group_id, post, keyword) alerts to send for this keyword
+                            for index, post in enumerate(posts):
+                                post_id = post.get('id')
+                                if not post_id:
+                                    continue
                                 
-                                init_key = f"{group_id}:{keyword}"
-                                is_first_time = init_key not in self.initialized_keywords
+                                is_new = not is_seen(post_id)
+                                in_backfill = bool(backfill_groups) and index < backfill_count
+                                if not is_new and not in_backfill:
+                                    continue
                                 
-                                if is_first_time:
-                                    # First time seeing this keyword for this group
-                                    # Send up to initial_backfill_count posts
-                                    self._log(f"  [BACKFILL] New keyword '{keyword}' for group {group_id}, sending up to {self.initial_backfill_count} posts")
-                                    posts_to_send = posts[:self.initial_backfill_count]
-                                    
-                                    for post in posts_to_send:
-                                        post_id = post.get('id')
-                                        if not post_id:
-                                            continue
-                                        
-                                        # Skip non-English posts
-                                        post_text = post.get('text', '')
-                                        if not self.is_english(post_text):
-                                            self._log(f"  [SKIP] Non-English post: {post_id[:30]}...")
-                                            continue
-                                        
-                                        # Mark as seen in global DB
-                                        self.seen_db.mark_seen(post_id)
-                                        
-                                        # Send alert
-                                        loop = asyncio.new_event_loop()
-                                        asyncio.set_event_loop(loop)
-                                        try:
-                                            loop.run_until_complete(
-                                                self.send_alert_to_group(group_id, post, keyword)
-                                            )
-                                        finally:
-                                            loop.close()
-                                        
-                                        self.processed_items[group_id].add(post_id)
-                                        time.sleep(1)  # Rate limiting
-                                    
-                                    # Mark this keyword as initialized
-                                    self.initialized_keywords.add(init_key)
-                                    self._log(f"  [BACKFILL] Sent {len(posts_to_send)} posts, keyword initialized")
-                                else:
-                                    # Regular cycle - only send NEW posts (not seen before)
-                                    for post in posts:
-                                        post_id = post.get('id')
-                                        if not post_id or self.seen_db.is_seen(post_id):
-                                            continue
-                                        
-                                        # Skip non-English posts
-                                        post_text = post.get('text', '')
-                                        if not self.is_english(post_text):
-                                            self._log(f"  [SKIP] Non-English post: {post_id[:30]}...")
-                                            self.seen_db.mark_seen(post_id)  # Still mark as seen to avoid reprocessing
-                                            continue
-                                        
-                                        self.seen_db.mark_seen(post_id)
-                                        self._log(f"  New post: {post_id[:30]}...")
-                                        
-                                        # Send alert
-                                        loop = asyncio.new_event_loop()
-                                        asyncio.set_event_loop(loop)
-                                        try:
-                                            loop.run_until_complete(
-                                                self.send_alert_to_group(group_id, post, keyword)
-                                            )
-                                        finally:
-                                            loop.close()
-                                        
-                                        self.processed_items[group_id].add(post_id)
-                                        time.sleep(1)  # Rate limiting
+                                # Skip non-English posts (still mark as seen to avoid reprocessing)
+                                if not is_english(post.get('text', '')):
+                                    logger.info(f"  [SKIP] Non-English post: {post_id[:30]}...")
+                                    if is_new:
+                                        mark_seen(post_id)
+                                    continue
+                                
+                                mark_seen(post_id)
+                                if is_new:
+                                    logger.info(f"  New post: {post_id[:30]}...")
+                                
+                                recipients = (backfill_groups if in_backfill else []) + (regular_groups if is_new else [])
+                                for group_id in recipients:
+                                    # Already sent to this group (e.g. under another keyword)
+                                    if post_id in processed_items[group_id]:
+                                        continue
+                                    jobs.append((group_id, post, keyword))
                             
-                            time.sleep(5)  # Delay between keyword searches
+                            # Mark this keyword as initialized for the backfilled groups
+                            for group_id in backfill_groups:
+                                initialized.add((group_id, keyword))
+                                self.store.mark_initialized(group_id, keyword)
+                                queued = sum(1 for job in jobs if job[0] == group_id)
+                                logger.info(f"  [BACKFILL] Queued {queued} posts for group {group_id}, keyword initialized")
+                            
+                            await self._dispatch_alerts(jobs)
+                            await asyncio.to_thread(self.seen_db.flush)
                             
                         except Exception as e:
-                            self._log(f"[ERROR] Error searching '{keyword}': {e}")
+                            logger.error(f"Error processing '{keyword}': {e}")
                     
-                    self.save_data()
+                    self.save_processed_items()
+                    await asyncio.to_thread(self.save_data)
                 
-                self._log(f"--- Cycle complete. Sleeping {self.check_interval}s ---")
+                sleep_for = self.check_interval * random.uniform(1 - self.interval_jitter, 1 + self.interval_jitter)
+                logger.info(f"--- Cycle complete. Sleeping {sleep_for:.0f}s ---")
                 
-                # Sleep in small chunks so we can stop quickly
-                for _ in range(self.check_interval):
-                    if not self.running:
-                        break
-                    time.sleep(1)
+                # stop_monitoring() cancels the task, which interrupts this sleep
+                await asyncio.sleep(sleep_for)
                     
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                self._log(f"[ERROR] Monitor error: {e}")
-                time.sleep(30)
-        
-        # Cleanup
-        if self.scraper:
-            self.scraper.close_browser()
-        self._log("=== Facebook Monitor Stopped ===")
+                logger.error(f"Monitor error: {e}")
+                await asyncio.sleep(30)
+    
+    async def run_monitor(self):
+        """Run the monitoring loop and always release the browser afterwards"""
+        try:
+            await self.monitoring_loop()
+        finally:
+            if self.seen_db:
+                self.seen_db.close()
+            for scraper in self.scrapers:
+                await asyncio.to_thread(scraper.close_browser)
+            self.scrapers = []
+            logger.info("=== Facebook Monitor Stopped ===")
     
     def start_monitoring(self):
-        """Start the monitoring thread"""
+        """Start the monitoring task on the running event loop"""
         if self.running:
             return
         
         self.running = True
-        self.monitor_thread = threading.Thread(target=self.monitoring_loop, daemon=True)
-        self.monitor_thread.start()
-        logger.info("Monitoring thread started")
+        self.monitor_task = asyncio.create_task(self.run_monitor())
+        logger.info("Monitoring task started")
     
-    def stop_monitoring(self):
-        """Stop the monitoring thread"""
+    async def stop_monitoring(self):
+        """Cancel the monitoring task and wait for it to clean up"""
         self.running = False
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=10)
-        logger.info("Monitoring thread stopped")
+        if self.monitor_task:
+            self.monitor_task.cancel()
+            try:
+                await asyncio.wait_for(self.monitor_task, timeout=10)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                pass
+            except Exception as e:
+                logger.error(f"Monitor task failed: {e}")
+            self.monitor_task = None
+        logger.info("Monitoring task stopped")
+    
+    async def post_init(self, application: Application):
+        """Open the alert HTTP session and start monitoring once the event loop is running"""
+        self._get_http_session()
+        self.start_monitoring()
+    
+    async def post_shutdown(self, application: Application):
+        """Stop monitoring and flush pending writes before the loop closes"""
+        await self.stop_monitoring()
+        if self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+        self.save_processed_items()
+        self.save_data()
     
     # =========================================================================
     # BOT STARTUP
@@ -1108,7 +1350,13 @@ class FacebookTelegramBot:
         logger.info(f"Groups configured: {len(self.groups)}")
         
         # Build the Telegram application
-        app = Application.builder().token(self.telegram_token).build()
+        app = (
+            Application.builder()
+            .token(self.telegram_token)
+            .post_init(self.post_init)
+            .post_shutdown(self.post_shutdown)
+            .build()
+        )
         
         # Register command handlers
         app.add_handler(CommandHandler("start", self.help_command))
@@ -1129,17 +1377,14 @@ class FacebookTelegramBot:
         # Message handler for keyword input
         app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
         
-        # Start monitoring in background
-        self.start_monitoring()
-        
         # Start the Telegram bot
         logger.info("Bot is running. Press Ctrl+C to stop.")
         try:
-            app.run_polling(drop_pending_updates=True)
+            app.run_polling(drop_pending_updates=True, timeout=self.poll_timeout, poll_interval=0)
         except KeyboardInterrupt:
             logger.info("Shutting down...")
         finally:
-            self.stop_monitoring()
+            self.store.close()
 
 
 def ensure_data_files():
@@ -1162,27 +1407,30 @@ def ensure_data_files():
         os.makedirs(data_dir, exist_ok=True)
         print(f"[STARTUP] Created/verified data directory: {data_dir}")
     
-    # Check if cookies file needs to be copied
+    # Check if cookies file needs to be copied (stat it once)
+    cookies_present = os.path.isfile(cookies_file)
     print(f"[STARTUP] Checking if cookies exist at: {cookies_file}")
-    print(f"[STARTUP] Cookies file exists? {os.path.exists(cookies_file)}")
+    print(f"[STARTUP] Cookies file exists? {cookies_present}")
     
-    if not os.path.exists(cookies_file):
+    if not cookies_present:
         # Render mounts secret files at /etc/secrets/FILENAME
-        secret_cookies = "/etc/secrets/fb_cookies.json"
+        secret_dir = "/etc/secrets"
+        secret_cookies = os.path.join(secret_dir, "fb_cookies.json")
         print(f"[STARTUP] Checking secret files at: {secret_cookies}")
-        print(f"[STARTUP] Secret file exists? {os.path.exists(secret_cookies)}")
         
-        # Also list /etc/secrets to see what's there
-        if os.path.exists("/etc/secrets"):
-            try:
-                files = os.listdir("/etc/secrets")
-                print(f"[STARTUP] Files in /etc/secrets: {files}")
-            except Exception as e:
-                print(f"[STARTUP] Error listing /etc/secrets: {e}")
-        else:
+        # One directory scan answers both "what's there" and "is the cookie file there"
+        try:
+            secret_files = {entry.name for entry in os.scandir(secret_dir)}
+            print(f"[STARTUP] Files in /etc/secrets: {sorted(secret_files)}")
+        except FileNotFoundError:
+            secret_files = set()
             print("[STARTUP] /etc/secrets directory does not exist")
+        except OSError as e:
+            secret_files = set()
+            print(f"[STARTUP] Error listing /etc/secrets: {e}")
+        print(f"[STARTUP] Secret file exists? {'fb_cookies.json' in secret_files}")
         
-        if os.path.exists(secret_cookies):
+        if 'fb_cookies.json' in secret_files:
             shutil.copy(secret_cookies, cookies_file)
             print(f"[STARTUP] ✓ Copied cookies from {secret_cookies} to {cookies_file}")
         # Also check repo root as fallback
@@ -1195,16 +1443,7 @@ def ensure_data_files():
     else:
         print(f"[STARTUP] ✓ Cookies file already exists at: {cookies_file}")
     
-    # Ensure bot_data.json and seen_posts.json exist (empty if not)
-    for filename in ["bot_data.json", "seen_posts.json"]:
-        filepath = os.path.join(data_dir, filename)
-        if not os.path.exists(filepath):
-            with open(filepath, 'w') as f:
-                if filename == "bot_data.json":
-                    json.dump({"groups": {}, "processed_items": {}, "initialized_keywords": []}, f)
-                else:
-                    json.dump({"posts": {}}, f)
-            print(f"[STARTUP] Created empty {filename}")
+    # seen_posts.jsonl and bot_data.db are created by SeenPostsDB / BotDataDB on first use
     
     print("[STARTUP] ========== ensure_data_files() complete ==========")
 
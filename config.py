@@ -29,6 +29,19 @@ TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", TELEGRAM_OWNER_CHAT_ID)
 # How often to run a full check cycle (in seconds)
 CHECK_INTERVAL = int(os.environ.get("CHECK_INTERVAL", "120"))  # 2 minutes
 
+# Number of browser instances searching keywords in parallel
+# (each is a full headless Chrome; raise carefully on small instances)
+SCRAPER_WORKERS = max(1, int(os.environ.get("SCRAPER_WORKERS", "1")))
+
+# Persistent Chrome HTTP cache, so Facebook's JS/CSS bundles survive browser restarts.
+# Each browser gets its own subdirectory; set to "" to use Chrome's default temp cache.
+CHROME_CACHE_DIR = os.environ.get("CHROME_CACHE_DIR", "/tmp/fb_chrome_cache")
+CHROME_CACHE_SIZE = 256 * 1024 * 1024
+
+# Keywords combined into one ("a" OR "b" ...) search; 1 = one search per keyword.
+# Larger batches mean fewer page loads but share MAX_POSTS_PER_PAGE between keywords.
+SEARCH_BATCH_SIZE = max(1, int(os.environ.get("SEARCH_BATCH_SIZE", "1")))
+
 # Max posts to extract per keyword search
 MAX_POSTS_PER_PAGE = 15
 
@@ -41,8 +54,10 @@ MAX_ACTION_DELAY = 4.0
 # =====================================================
 # On Render, mount a disk at /data
 DATA_DIR = os.environ.get("DATA_DIR", ".")
-SEEN_POSTS_FILE = os.path.join(DATA_DIR, "seen_posts.json")
-BOT_DATA_FILE = os.path.join(DATA_DIR, "bot_data.json")
+SEEN_POSTS_FILE = os.path.join(DATA_DIR, "seen_posts.jsonl")
+SEEN_POSTS_LEGACY_FILE = os.path.join(DATA_DIR, "seen_posts.json")  # Legacy, imported once into SEEN_POSTS_FILE
+BOT_DATA_FILE = os.path.join(DATA_DIR, "bot_data.json")  # Legacy, imported once into BOT_DB_FILE
+BOT_DB_FILE = os.path.join(DATA_DIR, "bot_data.db")
 
 # How many days to keep seen post IDs
 SEEN_POSTS_EXPIRY_DAYS = 4
@@ -1,71 +1,229 @@
 # Database/Storage Manager for tracking seen posts
 
+import hashlib
 import json
+import math
 import os
+import sqlite3
+import threading
 from datetime import datetime, timedelta
-from typing import Set, Optional
+from typing import Dict, Iterable, Set, Optional, Tuple
+
+# Faster JSON parsing when available
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _load_json_file(filepath: str):
+    """Parse a JSON file, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        with open(filepath, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _seen_line(post_id: str, timestamp: datetime) -> bytes:
+    """One seen-posts log line: {"post_id": "iso timestamp"} plus newline."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps({post_id: timestamp}, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps({post_id: timestamp.isoformat()}) + "\n").encode('utf-8')
+
+
+def _parse_timestamps(entries: dict) -> Dict[str, datetime]:
+    """Convert {post_id: iso string} to datetimes, dropping invalid entries."""
+    parsed = {}
+    for post_id, timestamp_str in entries.items():
+        try:
+            parsed[post_id] = datetime.fromisoformat(timestamp_str)
+        except (TypeError, ValueError):
+            continue
+    return parsed
+
+
+class BloomFilter:
+    """
+    Bloom filter for "have we already handled this ID?" checks, bounded like a
+    deque(maxlen): once the current generation holds `capacity` items it becomes
+    the previous generation and a fresh one is started, so the filter always
+    remembers the last `capacity` to `2 * capacity` items in constant memory.
+    False positives are possible (at most ~2x error_rate), false negatives are not
+    for items still inside the window.
+    """
+
+    def __init__(self, capacity: int = 5000, error_rate: float = 1e-4,
+                 bits: Optional[bytes] = None, count: int = 0,
+                 previous: Optional[bytes] = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.num_bytes = (self.num_bits + 7) // 8
+        self.bits = bytearray(bits) if bits else bytearray(self.num_bytes)
+        self.previous = bytes(previous) if previous else None
+        self.count = count
+
+    def _positions(self, item: str):
+        """Derive num_hashes bit positions from one digest (double hashing)."""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    @staticmethod
+    def _has_all(bits, positions) -> bool:
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions)
+
+    def add(self, item: str):
+        positions = self._positions(item)
+        if self._has_all(self.bits, positions):
+            return
+        if self.count >= self.capacity:
+            # Rotate generations; the oldest one is dropped
+            self.previous = bytes(self.bits)
+            self.bits = bytearray(self.num_bytes)
+            self.count = 0
+        for pos in positions:
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        positions = self._positions(item)
+        if self._has_all(self.bits, positions):
+            return True
+        return self.previous is not None and self._has_all(self.previous, positions)
+
+    def __len__(self) -> int:
+        return self.count + (self.capacity if self.previous is not None else 0)
+
+    def to_bytes(self) -> bytes:
+        """Serialize as a small header (capacity, count, error rate, generations) followed by the bitsets."""
+        generations = 2 if self.previous is not None else 1
+        header = f"{self.capacity}:{self.count}:{self.error_rate}:{generations}\n".encode('ascii')
+        return header + bytes(self.bits) + (self.previous or b"")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        header, _, payload = data.partition(b"\n")
+        fields = header.decode('ascii').split(':')
+        capacity, count, error_rate = int(fields[0]), int(fields[1]), float(fields[2])
+        generations = int(fields[3]) if len(fields) > 3 else 1
+        bloom = cls(capacity, error_rate, count=count)
+        bloom.bits = bytearray(payload[:bloom.num_bytes])
+        if generations == 2:
+            bloom.previous = bytes(payload[bloom.num_bytes:])
+        return bloom
+
 
 class SeenPostsDB:
-    """Tracks seen post IDs to prevent duplicate Telegram notifications."""
+    """
+    Tracks seen post IDs to prevent duplicate Telegram notifications.
+
+    Stored as an append-only JSONL log, one {"post_id": "iso timestamp"} object
+    per line (written with orjson when available); timestamps are datetimes in
+    memory. Marking is in-memory only; flush() appends pending entries and
+    cleanup_expired() compacts the log by rewriting it atomically.
+    """
     
-    def __init__(self, filepath: str, expiry_days: int = 7):
+    def __init__(self, filepath: str, expiry_days: int = 7, legacy_json: Optional[str] = None):
         self.filepath = filepath
         self.expiry_days = expiry_days
-        self.data = self._load()
+        self._pending: Dict[str, datetime] = {}
+        self._torn_tail = False
+        self.posts: Dict[str, datetime] = self._load(legacy_json)  # post_id -> time first seen
+        self._append_fp = open(self.filepath, 'ab')
+        if self._torn_tail:
+            self._append_fp.write(b"\n")  # Don't glue new entries onto a partial line
     
-    def _load(self) -> dict:
-        """Load seen posts from JSON file."""
+    def _load(self, legacy_json: Optional[str] = None) -> Dict[str, datetime]:
+        """Load seen posts from the JSONL log (or import the old JSON file once)."""
+        loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+        posts: Dict[str, datetime] = {}
         if os.path.exists(self.filepath):
             try:
-                with open(self.filepath, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
+                entries = {}
+                with open(self.filepath, 'rb') as f:
+                    for line in f:
+                        self._torn_tail = not line.endswith(b"\n")
+                        try:
+                            entries.update(loads(line))
+                        except ValueError:
+                            continue  # Partial line from an interrupted append
+                posts = _parse_timestamps(entries)
+            except IOError as e:
                 print(f"[WARNING] Could not load {self.filepath}: {e}")
-                return {"posts": {}}
-        return {"posts": {}}
+        elif legacy_json and os.path.exists(legacy_json):
+            try:
+                posts = _parse_timestamps(_load_json_file(legacy_json).get("posts", {}))
+                self.posts = posts
+                self._save()
+                print(f"[INFO] Imported {len(posts)} seen posts from {legacy_json}")
+            except (ValueError, IOError) as e:
+                print(f"[WARNING] Could not import {legacy_json}: {e}")
+        return posts
     
     def _save(self):
-        """Save seen posts to JSON file."""
+        """Compact the log: rewrite every live entry to a temp file and os.replace it in."""
+        tmp_path = self.filepath + '.tmp'
         try:
-            with open(self.filepath, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2)
+            with open(tmp_path, 'wb') as f:
+                f.writelines(_seen_line(post_id, ts) for post_id, ts in self.posts.items())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.filepath)
+            self._pending.clear()
         except IOError as e:
             print(f"[ERROR] Could not save {self.filepath}: {e}")
+            return
+        # The old append handle points at the replaced file
+        fp = getattr(self, '_append_fp', None)
+        if fp is not None:
+            fp.close()
+            self._append_fp = open(self.filepath, 'ab')
     
     def is_seen(self, post_id: str) -> bool:
         """Check if a post ID has already been seen."""
-        return post_id in self.data["posts"]
+        return post_id in self.posts
     
     def mark_seen(self, post_id: str):
         """Mark a post ID as seen with current timestamp."""
-        self.data["posts"][post_id] = datetime.now().isoformat()
-        self._save()
+        self.posts[post_id] = self._pending[post_id] = datetime.now()
     
     def mark_multiple_seen(self, post_ids: list):
         """Mark multiple post IDs as seen (batch operation)."""
-        timestamp = datetime.now().isoformat()
+        timestamp = datetime.now()
         for post_id in post_ids:
-            self.data["posts"][post_id] = timestamp
-        self._save()
+            self.posts[post_id] = self._pending[post_id] = timestamp
+    
+    def flush(self):
+        """Append pending entries to the log, if there are any."""
+        if not self._pending:
+            return
+        try:
+            self._append_fp.write(b''.join(_seen_line(post_id, ts) for post_id, ts in self._pending.items()))
+            self._append_fp.flush()
+            self._pending.clear()
+        except IOError as e:
+            print(f"[ERROR] Could not save {self.filepath}: {e}")
+    
+    def close(self):
+        """Flush pending entries and close the log."""
+        self.flush()
+        self._append_fp.close()
     
     def cleanup_expired(self):
-        """Remove entries older than expiry_days."""
-        if not self.data["posts"]:
+        """Remove entries older than expiry_days and compact the log."""
+        if not self.posts:
             return
         
         cutoff = datetime.now() - timedelta(days=self.expiry_days)
-        expired = []
-        
-        for post_id, timestamp_str in self.data["posts"].items():
-            try:
-                timestamp = datetime.fromisoformat(timestamp_str)
-                if timestamp < cutoff:
-                    expired.append(post_id)
-            except ValueError:
-                expired.append(post_id)  # Remove invalid entries
+        expired = [post_id for post_id, timestamp in self.posts.items() if timestamp < cutoff]
         
         for post_id in expired:
-            del self.data["posts"][post_id]
+            del self.posts[post_id]
         
         if expired:
             print(f"[INFO] Cleaned up {len(expired)} expired entries")
@@ -73,7 +231,201 @@ class SeenPostsDB:
     
     def get_seen_count(self) -> int:
         """Return the number of seen posts."""
-        return len(self.data["posts"])
+        return len(self.posts)
+
+
+class BotDataDB:
+    """
+    SQLite store for groups, keywords, processed items and initialized keywords.
+    Runs in WAL mode and writes only the rows touched by each mutation.
+    Mutations are not committed until commit() is called, so callers can
+    coalesce bursts of changes into a single transaction.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS groups (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            enabled INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE TABLE IF NOT EXISTS keywords (
+            group_id INTEGER NOT NULL,
+            kw TEXT NOT NULL,
+            PRIMARY KEY (group_id, kw)
+        );
+        CREATE TABLE IF NOT EXISTS processed_blooms (
+            group_id INTEGER PRIMARY KEY,
+            bloom BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS initialized (
+            group_id INTEGER NOT NULL,
+            kw TEXT NOT NULL,
+            PRIMARY KEY (group_id, kw)
+        );
+    """
+
+    def __init__(self, filepath: str, legacy_json: Optional[str] = None):
+        self.filepath = filepath
+        # Shared by the Telegram handlers and the monitor thread
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(filepath, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+        if legacy_json:
+            self._import_legacy_json(legacy_json)
+
+    # PRAGMA user_version once the legacy bot_data.json import has been handled, so
+    # removing every group later doesn't bring the old data back on restart
+    LEGACY_IMPORTED_VERSION = 1
+
+    def _mark_legacy_imported(self):
+        """Record that the legacy import is done (call inside the import transaction)."""
+        self.conn.execute(f"PRAGMA user_version = {self.LEGACY_IMPORTED_VERSION}")
+
+    def _import_legacy_json(self, filepath: str):
+        """One-time import of the old bot_data.json into an empty database."""
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] >= self.LEGACY_IMPORTED_VERSION:
+            return
+        if not os.path.exists(filepath) or self.conn.execute("SELECT 1 FROM groups LIMIT 1").fetchone():
+            with self._lock, self.conn:
+                self._mark_legacy_imported()
+            return
+
+        try:
+            data = _load_json_file(filepath)
+        except (ValueError, IOError) as e:
+            print(f"[WARNING] Could not import {filepath}: {e}")
+            return
+
+        with self._lock, self.conn:
+            for group_id_str, group_info in data.get('groups', {}).items():
+                group_id = int(group_id_str)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO groups (id, name, enabled) VALUES (?, ?, ?)",
+                    (group_id, group_info.get('name', f'Group {group_id}'), int(group_info.get('enabled', True)))
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO keywords (group_id, kw) VALUES (?, ?)",
+                    [(group_id, kw) for kw in group_info.get('keywords', [])]
+                )
+            for group_id_str, items in data.get('processed_items', {}).items():
+                bloom = BloomFilter()
+                for post_id in items:
+                    bloom.add(post_id)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO processed_blooms (group_id, bloom) VALUES (?, ?)",
+                    (int(group_id_str), bloom.to_bytes())
+                )
+            for init_key in data.get('initialized_keywords', []):
+                group_id_str, _, kw = init_key.partition(':')
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO initialized (group_id, kw) VALUES (?, ?)",
+                    (int(group_id_str), kw)
+                )
+            self._mark_legacy_imported()
+        print(f"[INFO] Imported legacy data from {filepath}")
+
+    def _write(self, sql: str, params: tuple = ()):
+        """Execute a single statement in the pending transaction."""
+        with self._lock:
+            self.conn.execute(sql, params)
+
+    def _write_many(self, sql: str, rows: Iterable[tuple]):
+        """Execute a statement for many rows in the pending transaction."""
+        with self._lock:
+            self.conn.executemany(sql, rows)
+
+    def commit(self):
+        """Commit all pending writes."""
+        with self._lock:
+            self.conn.commit()
+
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+
+    def load_groups(self) -> Dict[int, Dict]:
+        """Return group_id -> {name, keywords, enabled}."""
+        with self._lock:
+            groups = {
+                group_id: {'name': name, 'keywords': set(), 'enabled': bool(enabled)}
+                for group_id, name, enabled in self.conn.execute("SELECT id, name, enabled FROM groups")
+            }
+            for group_id, kw in self.conn.execute("SELECT group_id, kw FROM keywords"):
+                if group_id in groups:
+                    groups[group_id]['keywords'].add(kw)
+        return groups
+
+    def load_processed_items(self) -> Dict[int, BloomFilter]:
+        """Return group_id -> Bloom filter of processed post IDs."""
+        with self._lock:
+            return {
+                group_id: BloomFilter.from_bytes(bloom)
+                for group_id, bloom in self.conn.execute("SELECT group_id, bloom FROM processed_blooms")
+            }
+
+    def load_initialized(self) -> Set[Tuple[int, str]]:
+        """Return the (group_id, keyword) pairs that already had their backfill."""
+        with self._lock:
+            return set(self.conn.execute("SELECT group_id, kw FROM initialized"))
+
+    # -------------------------------------------------------------------------
+    # Mutations
+    # -------------------------------------------------------------------------
+
+    def add_group(self, group_id: int, name: str, enabled: bool = True):
+        self._write(
+            "INSERT OR REPLACE INTO groups (id, name, enabled) VALUES (?, ?, ?)",
+            (group_id, name, int(enabled))
+        )
+
+    def remove_group(self, group_id: int):
+        """Remove a group and everything stored for it."""
+        with self._lock:
+            for table, column in (('groups', 'id'), ('keywords', 'group_id'),
+                                  ('processed_blooms', 'group_id'), ('initialized', 'group_id')):
+                self.conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (group_id,))
+
+    def set_group_enabled(self, group_id: int, enabled: bool):
+        self._write("UPDATE groups SET enabled = ? WHERE id = ?", (int(enabled), group_id))
+
+    def add_keyword(self, group_id: int, keyword: str):
+        self._write("INSERT OR IGNORE INTO keywords (group_id, kw) VALUES (?, ?)", (group_id, keyword))
+
+    def add_keywords(self, group_id: int, keywords: Iterable[str]):
+        self._write_many(
+            "INSERT OR IGNORE INTO keywords (group_id, kw) VALUES (?, ?)",
+            [(group_id, kw) for kw in keywords]
+        )
+
+    def remove_keyword(self, group_id: int, keyword: str):
+        self._write("DELETE FROM keywords WHERE group_id = ? AND kw = ?", (group_id, keyword))
+
+    def remove_keywords(self, group_id: int, keywords: Iterable[str]):
+        self._write_many(
+            "DELETE FROM keywords WHERE group_id = ? AND kw = ?",
+            [(group_id, kw) for kw in keywords]
+        )
+
+    def clear_keywords(self, group_id: int):
+        self._write("DELETE FROM keywords WHERE group_id = ?", (group_id,))
+
+    def save_processed(self, group_id: int, bloom: BloomFilter):
+        self._write(
+            "INSERT OR REPLACE INTO processed_blooms (group_id, bloom) VALUES (?, ?)",
+            (group_id, bloom.to_bytes())
+        )
+
+    def mark_initialized(self, group_id: int, keyword: str):
+        self._write("INSERT OR IGNORE INTO initialized (group_id, kw) VALUES (?, ?)", (group_id, keyword))
+
+    def close(self):
+        """Commit pending writes and close the connection."""
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
 
 
 if __name__ == "__main__":
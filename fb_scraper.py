@@ -1,15 +1,26 @@
-# Facebook Search Scraper - Headless Chrome + BeautifulSoup
+# Facebook Search Scraper - Headless Chrome + lxml
 # FIXED: Uses post URLs as boundary markers instead of container guessing
 
 import json
+import logging
 import time
 import random
 import os
 import re
 import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from urllib.parse import quote
-from typing import List, Dict, Optional, Tuple
-from bs4 import BeautifulSoup, NavigableString
+from typing import Any, List, Dict, NamedTuple, Optional, Tuple
+import lxml.html
+from lxml.etree import XPath, ParserError, strip_elements
+
+# Faster JSON parsing when available
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -26,32 +37,210 @@ try:
 except ImportError:
     USE_WEBDRIVER_MANAGER = False
 
-from config import MAX_POSTS_PER_PAGE, MIN_ACTION_DELAY, MAX_ACTION_DELAY
+from config import (
+    MAX_POSTS_PER_PAGE, MIN_ACTION_DELAY, MAX_ACTION_DELAY, SCRAPER_WORKERS,
+    CHROME_CACHE_DIR, CHROME_CACHE_SIZE
+)
 from url_cleaner import clean_facebook_url, clean_html_entities
 
 import sys
 
+logger = logging.getLogger(__name__)
+
 def log(msg: str):
     """Print with immediate flush so logs appear in real-time."""
     print(msg, flush=True)
     sys.stdout.flush()
 
 
+# Compiled XPath queries for post extraction (one C-level traversal each)
+MAIN_CONTENT_XPATH = XPath("(.//div[@role='main'])[1] | (.//div[@role='feed'])[1]")
+POST_LINK_XPATH = XPath(
+    ".//a[contains(@href,'/posts/') or contains(@href,'/videos/') or contains(@href,'/photos/')"
+    " or contains(@href,'/photo/') or contains(@href,'story_fbid=') or contains(@href,'/permalink/')"
+    " or contains(@href,'fbid=')]"
+    "[not(contains(@href,'/search/')) and not(contains(@href,'/hashtag/'))]"
+)
+HEADER_XPATH = XPath(".//h3|.//h4")
+
+
+def element_text(element, separator: str = ' ') -> str:
+    """Stripped text of an element's subtree, joined with separator."""
+    return separator.join(s for s in (t.strip() for t in element.itertext()) if s)
+
+
+def has_text_over(element, limit: int) -> bool:
+    """True if the element's stripped text is longer than limit, stopping as soon as it is."""
+    total = 0
+    for t in element.itertext():
+        total += len(t.strip())
+        if total > limit:
+            return True
+    return False
+
+
+# Precompiled patterns for post text cleaning and author/timestamp extraction
+_TIMESTAMP_LINK_RE = re.compile(r'^\d+[hdmw]')
+_TRANSLATION_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'·?\s*See original\s*·?',
+    r'·?\s*Rate this translation\s*·?',
+    r'·?\s*Translated by\s*·?',
+    r'·?\s*Translate\s*·?',
+    r'·?\s*Auto-translated\s*·?',
+    r'Automatically translated.*?$',
+)]
+# Decoy characters: spaced runs become a space, short digit/letter chains are deleted
+_DECOY_RE = re.compile(
+    r'(?P<space>(?:\s[a-zA-Z0-9]\s){6,}|(?:^|\s)(?:[a-zA-Z0-9]\s){6,})'
+    r'|\b[0-9]\s+[a-zA-Z]\s+[0-9]\s+[a-zA-Z]\s+[0-9]\b'
+    r'|\b[a-zA-Z]\s[0-9]\s[a-zA-Z]\s[0-9]\s[a-zA-Z]\b'
+)
+# Single alternation: the text is scanned once instead of once per pattern
+_NOISE_RE = re.compile('|'.join(f'(?:{p})' for p in (
+    r'Find friends.*?notifications?',
+    r'Number of unread.*?notifications?',
+    r'Search results',
+    r'Filters\s+All\s+People\s+Reels\s+Marketplace\s+Pages\s+Groups\s+Events',
+    r'(Facebook\s*){3,}',
+    r'Mark as read',
+    r'Earlier\s+Unread',
+    r'Welcome to Facebook!.*?friends\.',
+    r'You might like',
+    r'See all\s+Unread',
+    r'All\s+Unread\s+New',
+    r'Tap here to find people',
+    r'Verified account',
+    r'Click to expand',
+    r'\d+:\d+\s*/\s*\d+:\d+',
+    r'Shared with Public',
+    r'· Follow',
+    r'Notifications\s+',
+    r'All reactions:\s*\d+',
+    r'\d+\s+comments?\s+\d+\s+shares?',
+    r'Like\s+Comment\s+Shar',
+    r'\bSophie\b',
+    r'\bSophie Burns\b',
+    r'Turn on\s+Not now\s+New\s+On Facebook',
+    r'All Unread.*?Turn on.*?Not now',
+    r'See more',
+    r'Fewer bubbles.*?table',  # Part of the garbled example
+    r'\.\.\.·',  # Trailing dots with separator
+)), re.IGNORECASE)
+_AUTHOR_PREFIX_RE = re.compile(r'^[A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,2}\s*·\s*')
+_TS_PREFIX_RE = re.compile(r'^\d+[hdmw]\s*·\s*')
+# Runs of dots become "...", random gibberish domains like "1RI4GlF2.com" are deleted
+_DOTS_OR_GIBBERISH_RE = re.compile(r'(?P<dots>\.{3,})|\b[a-zA-Z0-9]{6,}\.com\b')
+_LEADING_SEP_RE = re.compile(r'^·\s*')
+_TRAILING_SEP_RE = re.compile(r'\s*·$')
+_AUTHOR_STATUS_RE = re.compile(
+    r'(?:feeling \w+\.?|is at .*|is with .*|was live\.?|added \d+ .*|shared a .*'
+    r'|Verified account|Verified|Follow)\s*$',
+    re.IGNORECASE
+)
+_UI_NOISE_RE = re.compile(
+    r'notification|sophie|filters|all|see|new|earlier|like|share|comment|sponsored|search',
+    re.IGNORECASE
+)
+_TIMESTAMP_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'\b\d+[hdmw]\b', r'\bJust now\b', r'\bYesterday\b',
+    r'\b\d+ hour', r'\b\d+ min', r'\b\d+ day', r'\b\d+ week'
+)]
+
+# Scroll the feed until the number of articles is unchanged for 3 ticks (or 20 ticks pass),
+# then report the count; replaces a fixed settle sleep
+SCROLL_SETTLE_JS = """
+const done = arguments[arguments.length - 1];
+let last = -1, same = 0, ticks = 0;
+const tick = () => {
+    window.scrollBy(0, 2000);
+    const n = document.querySelectorAll("[role='article']").length;
+    if (n === last) {
+        if (++same >= 3) return done(n);
+    } else {
+        same = 0;
+        last = n;
+    }
+    if (++ticks >= 20) return done(n);
+    setTimeout(tick, 400);
+};
+tick();
+"""
+SCROLL_SCRIPT_TIMEOUT = 15
+
+# CDN origins search pages load from; preconnected once the browser is logged in
+PRECONNECT_ORIGINS = ["https://static.xx.fbcdn.net", "https://scontent.xx.fbcdn.net"]
+PRECONNECT_JS = """
+for (const origin of arguments[0]) {
+    for (const rel of ['preconnect', 'dns-prefetch']) {
+        const link = document.createElement('link');
+        link.rel = rel;
+        link.href = origin;
+        link.crossOrigin = '';
+        document.head.appendChild(link);
+    }
+}
+"""
+
+# Resource URLs the scraper never needs, matched by Chrome's network layer
+# (trailing * so CDN URLs with query strings like ".jpg?stp=..." match too)
+BLOCKED_URL_PATTERNS = [
+    "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.svg*",
+    "*.mp4*", "*.webm*", "*.woff*", "*fbcdn*video*",
+    "*google-analytics*", "*doubleclick*",
+]
+
+# Post search URL with the "Recent posts" filter applied
+RECENT_POSTS_FILTER = "eyJyZWNlbnRfcG9zdHM6MCI6IntcIm5hbWVcIjpcInJlY2VudF9wb3N0c1wiLFwiYXJnc1wiOlwiXCJ9In0%3D"
+SEARCH_URL_TEMPLATE = "https://www.facebook.com/search/posts?q={q}&filters=" + RECENT_POSTS_FILTER
+
+# Serialize the results area in the browser instead of shipping the full DOM via page_source
+MAIN_HTML_JS = (
+    "const main = document.querySelector(\"[role='main']\");"
+    "return main ? main.outerHTML : document.documentElement.outerHTML;"
+)
+
+def _decoy_replacement(match) -> str:
+    return ' ' if match.lastgroup == 'space' else ''
+
+
+def _dots_or_gibberish_replacement(match) -> str:
+    return '...' if match.lastgroup == 'dots' else ''
+
+
+class PostAnchor(NamedTuple):
+    """A post link found on a search page."""
+    url: str                  # Cleaned post URL
+    element: Any              # The <a> element, for container lookup
+    timestamp: Optional[str]  # Link text when it looks like "1h", "2d", ...
+
+
+# Keep parallel searches well under Facebook's rate limits
+MAX_SEARCH_PROCESSES = 4
+
+
 class FacebookSearchScraper:
     """Headless Chrome scraper for Facebook Search - Uses URL boundaries for clean post isolation."""
     
-    def __init__(self, cookies_file: str = "fb_cookies.json"):
+    def __init__(self, cookies_file: str = "fb_cookies.json", cache_slot: int = 0):
         self.cookies_file = cookies_file
+        self.cache_slot = cache_slot  # Separate disk cache per concurrently running browser
         self.driver = None
         self.cookies = self._load_cookies()
     
     def _load_cookies(self) -> List[Dict]:
-        """Load Facebook cookies from JSON file."""
-        if os.path.exists(self.cookies_file):
-            with open(self.cookies_file, 'r') as f:
-                return json.load(f)
-        else:
+        """Load Facebook cookies from JSON file, keeping only those the browser can set on facebook.com."""
+        if not os.path.exists(self.cookies_file):
             raise FileNotFoundError(f"Cookies file not found: {self.cookies_file}")
+        
+        if ORJSON_AVAILABLE:
+            with open(self.cookies_file, 'rb') as f:
+                cookies = orjson.loads(f.read())
+        else:
+            with open(self.cookies_file, 'r') as f:
+                cookies = json.load(f)
+        
+        # Cookies for other domains always fail add_cookie (one wasted WebDriver round-trip each)
+        return [c for c in cookies if c.get('domain', '.facebook.com').endswith('facebook.com')]
     
     def _random_delay(self, multiplier: float = 1.0):
         """Random delay for rate limiting."""
@@ -76,6 +265,22 @@ class FacebookSearchScraper:
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
             
+            # Keep Facebook's static bundles in a persistent disk cache across restarts
+            if CHROME_CACHE_DIR:
+                cache_dir = os.path.join(CHROME_CACHE_DIR, f"browser{self.cache_slot}")
+                chrome_options.add_argument(f"--disk-cache-dir={cache_dir}")
+                chrome_options.add_argument(f"--disk-cache-size={CHROME_CACHE_SIZE}")
+            
+            # Only text and links are scraped - don't download images or show notification prompts
+            chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+            chrome_options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.default_content_setting_values.notifications": 2,
+            })
+            
+            # Return from driver.get() at DOMContentLoaded; the search waits for the feed itself
+            chrome_options.page_load_strategy = 'eager'
+            
             # Create driver
             if USE_WEBDRIVER_MANAGER:
                 service = Service(ChromeDriverManager().install())
@@ -84,53 +289,22 @@ class FacebookSearchScraper:
                 # Use system chromedriver (for Render)
                 self.driver = webdriver.Chrome(options=chrome_options)
             
-            # Navigate to Facebook first (required for cookie domain)
-            self.driver.get("https://www.facebook.com")
-            time.sleep(2)
-            
-            # Inject cookies
-            log(f"[BROWSER] Injecting {len(self.cookies)} cookies...")
-            success_count = 0
-            fail_count = 0
-            important_cookies = {'c_user': False, 'xs': False, 'datr': False, 'fr': False}
-            
-            for cookie in self.cookies:
-                try:
-                    # Track important cookies
-                    if cookie['name'] in important_cookies:
-                        important_cookies[cookie['name']] = True
-                        log(f"[BROWSER] Found key cookie: {cookie['name']}")
-                    
-                    selenium_cookie = {
-                        'name': cookie['name'],
-                        'value': cookie['value'],
-                        'domain': cookie.get('domain', '.facebook.com'),
-                        'path': cookie.get('path', '/'),
-                        'secure': cookie.get('secure', True),
-                        'httpOnly': cookie.get('httpOnly', False)
-                    }
-                    self.driver.add_cookie(selenium_cookie)
-                    success_count += 1
-                except Exception as e:
-                    fail_count += 1
-                    log(f"[BROWSER] Cookie failed: {cookie.get('name', 'unknown')} - {e}")
-            
-            log(f"[BROWSER] Cookie injection: {success_count} success, {fail_count} failed")
+            self.driver.set_script_timeout(SCROLL_SCRIPT_TIMEOUT)
             
-            # Check for critical cookies
-            missing_critical = [k for k, v in important_cookies.items() if not v]
-            if missing_critical:
-                log(f"[BROWSER] WARNING: Missing critical cookies: {missing_critical}")
-            else:
-                log("[BROWSER] All critical cookies present!")
+            # Block media and font requests at the network layer (thumbnails, videos, webfonts)
+            try:
+                self.driver.execute_cdp_cmd("Network.enable", {})
+                self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+            except Exception as e:
+                log(f"[BROWSER] Could not block media requests: {e}")
             
-            # Refresh to apply cookies
-            self.driver.refresh()
+            # Inject cookies and load Facebook with them applied
+            self._inject_cookies()
             time.sleep(1)  # Reduced from 3
             
             # Check if we're logged in by looking at the page
             page_title = self.driver.title
-            log(f"[BROWSER] After refresh, page title: {page_title}")
+            log(f"[BROWSER] After cookie login, page title: {page_title}")
             
             # Check if login was successful
             if "log in" in page_title.lower() or "sign up" in page_title.lower():
@@ -139,6 +313,12 @@ class FacebookSearchScraper:
                     log("[BROWSER] Login failed!")
                     return False
             
+            # Warm DNS+TLS to Facebook's CDN origins before the first search
+            try:
+                self.driver.execute_script(PRECONNECT_JS, PRECONNECT_ORIGINS)
+            except WebDriverException as e:
+                log(f"[BROWSER] Could not add preconnect hints: {e}")
+            
             log("[BROWSER] Headless Chrome ready and authenticated!")
             return True
             
@@ -146,6 +326,77 @@ class FacebookSearchScraper:
             log(f"[BROWSER] Failed to start: {e}")
             return False
     
+    def _inject_cookies(self):
+        """
+        Install the session cookies and open Facebook with them.
+        Uses one CDP Network.setCookies call (no page load needed first);
+        falls back to per-cookie add_cookie if CDP is unavailable.
+        """
+        log(f"[BROWSER] Injecting {len(self.cookies)} cookies...")
+        important_cookies = {'c_user': False, 'xs': False, 'datr': False, 'fr': False}
+        browser_cookies = []
+        for cookie in self.cookies:
+            # Track important cookies
+            if cookie['name'] in important_cookies:
+                important_cookies[cookie['name']] = True
+                log(f"[BROWSER] Found key cookie: {cookie['name']}")
+            
+            browser_cookies.append({
+                'name': cookie['name'],
+                'value': cookie['value'],
+                'domain': cookie.get('domain', '.facebook.com'),
+                'path': cookie.get('path', '/'),
+                'secure': cookie.get('secure', True),
+                'httpOnly': cookie.get('httpOnly', False)
+            })
+        
+        try:
+            self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": browser_cookies})
+            log(f"[BROWSER] Cookie injection: {len(browser_cookies)} set via CDP")
+            self.driver.get("https://www.facebook.com")
+        except WebDriverException as e:
+            log(f"[BROWSER] CDP cookie injection failed ({e}), adding cookies one by one...")
+            self._add_cookies_one_by_one(browser_cookies)
+        
+        # Check for critical cookies
+        missing_critical = [k for k, v in important_cookies.items() if not v]
+        if missing_critical:
+            log(f"[BROWSER] WARNING: Missing critical cookies: {missing_critical}")
+        else:
+            log("[BROWSER] All critical cookies present!")
+    
+    def _add_cookies_one_by_one(self, browser_cookies: List[Dict]):
+        """WebDriver add_cookie path: needs a facebook.com page open, then a refresh."""
+        # Navigate to Facebook first (required for cookie domain)
+        self.driver.get("https://www.facebook.com")
+        time.sleep(2)
+        
+        success_count = 0
+        fail_count = 0
+        for cookie in browser_cookies:
+            try:
+                self.driver.add_cookie(cookie)
+                success_count += 1
+            except Exception as e:
+                fail_count += 1
+                log(f"[BROWSER] Cookie failed: {cookie.get('name', 'unknown')} - {e}")
+        
+        log(f"[BROWSER] Cookie injection: {success_count} success, {fail_count} failed")
+        
+        # Refresh to apply cookies
+        self.driver.refresh()
+    
+    def restart_if_dead(self) -> bool:
+        """Restart the browser if its session has died; True if a usable browser is running."""
+        if self.driver is not None:
+            try:
+                self.driver.current_url
+                return True
+            except WebDriverException:
+                log("[BROWSER] Session is dead, restarting...")
+                self.close_browser()
+        return self.start_browser()
+    
     def _login_with_credentials(self) -> bool:
         """Login to Facebook using email and password."""
         import os
@@ -225,11 +476,22 @@ class FacebookSearchScraper:
         Search Facebook for a keyword and extract posts.
         Uses URL boundaries to properly isolate individual posts.
         """
-        encoded_keyword = quote(keyword)
-        recent_filter = "eyJyZWNlbnRfcG9zdHM6MCI6IntcIm5hbWVcIjpcInJlY2VudF9wb3N0c1wiLFwiYXJnc1wiOlwiXCJ9In0%3D"
-        search_url = f"https://www.facebook.com/search/posts?q={encoded_keyword}&filters={recent_filter}"
+        return self.search_keywords([keyword])
+    
+    def search_keywords(self, keywords: List[str]) -> List[Dict]:
+        """
+        Search Facebook for several keywords in one OR query and extract posts.
+        Each post is tagged with every keyword its text contains
+        (post['keywords']); post['keyword'] is the first of them.
+        """
+        if len(keywords) == 1:
+            query = keywords[0]
+        else:
+            query = " OR ".join(f'"{kw}"' for kw in keywords)
+        search_url = SEARCH_URL_TEMPLATE.format(q=quote(query, safe=''))
+        keyword = keywords[0]
         
-        log(f"\n[SEARCH] Keyword: '{keyword}'")
+        log(f"\n[SEARCH] Keyword: '{query}'")
         log(f"[SEARCH] URL: {search_url}")
         
         try:
@@ -245,10 +507,6 @@ class FacebookSearchScraper:
                 print(f"[SEARCH] Timeout loading page")
                 return []
             
-            # Wait longer for JavaScript/React content to load
-            log("[DEBUG] Waiting for content to load...")
-            time.sleep(2)  # Reduced from 5
-            
             # Try to wait for actual search results container
             try:
                 WebDriverWait(self.driver, 5).until(  # Reduced from 10
@@ -258,6 +516,13 @@ class FacebookSearchScraper:
             except TimeoutException:
                 log("[DEBUG] No feed container found, continuing anyway...")
             
+            # Scroll to lazy-load posts until the article count stops growing
+            try:
+                article_count = self.driver.execute_async_script(SCROLL_SETTLE_JS)
+                log(f"[DEBUG] Feed settled with {article_count} articles")
+            except TimeoutException:
+                log("[DEBUG] Feed did not settle in time, continuing anyway...")
+            
             # Debug: Log page title to see if we're logged in
             page_title = self.driver.title
             log(f"[DEBUG] Page title: {page_title}")
@@ -269,15 +534,15 @@ class FacebookSearchScraper:
             if "login" in current_url.lower() or "checkpoint" in current_url.lower():
                 log("[ERROR] Redirected to login/checkpoint page - cookies may be expired!")
                 
-            # Get page HTML
-            html = self.driver.page_source
+            # Get only the results area's HTML (whole document if there is no main container)
+            html = self.driver.execute_script(MAIN_HTML_JS)
             
             # Debug: Check if we see "Log In" button (not logged in indicator)
             if 'Log In</span>' in html or 'Log in</span>' in html:
                 log("[WARNING] Page contains 'Log In' button - cookies may not be working!")
             
-            # Parse with BeautifulSoup - NEW METHOD
-            posts = self._extract_posts_by_url_boundaries(html, keyword)
+            # Parse with lxml - NEW METHOD
+            posts = self._extract_posts_by_url_boundaries(html, keywords)
             
             # Debug: If no posts found, save screenshot
             if len(posts) == 0:
@@ -288,63 +553,67 @@ class FacebookSearchScraper:
                 except Exception as e:
                     log(f"[DEBUG] Could not save screenshot: {e}")
             
-            log(f"[SEARCH] Found {len(posts)} clean posts for '{keyword}'")
+            log(f"[SEARCH] Found {len(posts)} clean posts for '{query}'")
             return posts
             
         except WebDriverException as e:
             print(f"[SEARCH] WebDriver error: {e}")
+            # Keep this scraper usable for the next search if Chrome went away
+            self.restart_if_dead()
             return []
         except Exception as e:
             print(f"[SEARCH] Error: {e}")
             return []
     
-    def _extract_posts_by_url_boundaries(self, html: str, keyword: str) -> List[Dict]:
+    def _extract_posts_by_url_boundaries(self, html: str, keywords: List[str]) -> List[Dict]:
         """
         NEW APPROACH: Use post URLs as definitive boundaries.
         Extract all post links, then grab content between consecutive links.
         """
-        soup = BeautifulSoup(html, 'html.parser')
+        # Case-insensitive matchers built once per page (no per-post lower() of the text)
+        keyword_res = [(kw, re.compile(re.escape(kw), re.IGNORECASE)) for kw in keywords]
         posts = []
         
-        # Step 1: Find main content area (skip nav/sidebar)
-        main_content = soup.find('div', role='main') or soup.find('div', role='feed') or soup
+        # Step 1: Parse once and find main content area (skip nav/sidebar)
+        try:
+            doc = lxml.html.document_fromstring(html)
+        except ParserError:
+            return posts
+        strip_elements(doc, 'script', 'style', with_tail=False)
+        main_matches = MAIN_CONTENT_XPATH(doc)
+        main_content = main_matches[0] if main_matches else doc
         
-        # Step 2: Extract all post URLs with their positions
+        # Step 2: Extract all post URLs (search/hashtag relinks are excluded by the XPath)
         post_anchors = []
-        for link in main_content.find_all('a', href=True):
-            href = link.get('href', '')
-            
-            # Only consider actual post URLs
-            if any(pattern in href for pattern in ['/posts/', '/videos/', '/photos/', '/photo/', 'story_fbid=', '/permalink/', 'fbid=']):
-                # Skip search/hashtag relinks
-                if '/search/' in href or '/hashtag/' in href:
-                    continue
-                
-                # Get link text (often timestamp like "1h", "2d")
-                link_text = link.get_text(strip=True)
-                
-                # Clean URL
-                full_url = href if href.startswith('http') else f"https://www.facebook.com{href}"
-                clean_url = clean_facebook_url(full_url)
-                
-                # Store link with its BeautifulSoup element for position tracking
-                post_anchors.append({
-                    'url': clean_url,
-                    'element': link,
-                    'timestamp': link_text if re.match(r'^\d+[hdmw]', link_text) else None
-                })
+        for link in POST_LINK_XPATH(main_content):
+            href = link.get('href')
+            
+            # Get link text (often timestamp like "1h", "2d")
+            link_text = element_text(link, '')
+            
+            # Clean URL
+            full_url = href if href.startswith('http') else f"https://www.facebook.com{href}"
+            clean_url = clean_facebook_url(full_url)
+            
+            # Store link with its element for container lookup
+            post_anchors.append(PostAnchor(
+                clean_url,
+                link,
+                link_text if _TIMESTAMP_LINK_RE.match(link_text) else None
+            ))
         
-        print(f"[PARSE] Found {len(post_anchors)} post URL anchors")
+        logger.debug("[PARSE] Found %d post URL anchors", len(post_anchors))
         
         # Step 3: For each post URL, extract the content BEFORE it (that's the post)
         seen_urls = set()
         seen_texts = set()
+        seen_containers = set()  # Containers already extracted (via an earlier anchor)
         
         for i, anchor in enumerate(post_anchors):
             if len(posts) >= MAX_POSTS_PER_PAGE:
                 break
             
-            url = anchor['url']
+            url = anchor.url
             
             # Skip duplicate URLs
             if url in seen_urls:
@@ -352,19 +621,28 @@ class FacebookSearchScraper:
             
             # Find the content block associated with this post
             # Strategy: Walk up from the link to find the containing post div
-            post_container = self._find_post_container(anchor['element'])
+            post_container = self._find_post_container(anchor.element)
+            
+            if post_container is None:
+                continue
             
-            if not post_container:
+            # Facebook puts several links in one post (timestamp, photo, comments); the
+            # container's text was already accepted or rejected for the first of them
+            if post_container in seen_containers:
                 continue
+            seen_containers.add(post_container)
             
             # Extract text from this container
-            raw_text = post_container.get_text(separator=' ', strip=True)
+            raw_text = element_text(post_container)
             
             # Clean the text
             clean_text = self._clean_post_text(raw_text)
             
-            # Skip if too short or doesn't contain keyword
-            if len(clean_text) < 50 or keyword.lower() not in clean_text.lower():
+            # Skip if too short or doesn't contain any keyword
+            if len(clean_text) < 50:
+                continue
+            matched = [kw for kw, kw_re in keyword_res if kw_re.search(clean_text)]
+            if not matched:
                 continue
             
             # Skip duplicates
@@ -378,9 +656,9 @@ class FacebookSearchScraper:
             author = self._extract_author(post_container)
             
             # Extract timestamp
-            timestamp = anchor['timestamp']
+            timestamp = anchor.timestamp
             if not timestamp:
-                timestamp = self._extract_timestamp(post_container)
+                timestamp = self._extract_timestamp(post_container, raw_text)
             
             # Create post ID using SHA256 of URL ONLY for stable deduplication
             # Previously used clean_text[:150] + url, but text is unstable (reaction counts change)
@@ -390,74 +668,60 @@ class FacebookSearchScraper:
             post = {
                 "id": post_id,
                 "text": clean_text[:1000],
-                "keyword": keyword,
+                "keyword": matched[0],
+                "keywords": matched,
                 "author": author or "Unknown",
                 "post_url": url,
                 "timestamp": timestamp
             }
             
             posts.append(post)
-            print(f"[PARSE] Extracted post {len(posts)}: {author or 'Unknown'} - {clean_text[:60]}...")
+            logger.debug("[PARSE] Extracted post %d: %s - %s...", len(posts), author or 'Unknown', clean_text[:60])
         
         return posts
     
     def _find_post_container(self, link_element) -> Optional[any]:
         """
         Walk up from a post link to find its containing post div.
-        Look for divs with role='article' or sufficient content.
+        Look for divs with role='article' or sufficient content; the nearest one wins,
+        so an outer article that also wraps the comments is never reached first.
         """
-        current = link_element
-        
         # Walk up max 10 levels
-        for _ in range(10):
-            current = current.parent
-            if not current or current.name == 'body':
+        for ancestor in islice(link_element.iterancestors(), 10):
+            if ancestor.tag == 'body':
                 return None
             
             # Check if this is a post container
-            if current.name == 'div':
+            if ancestor.tag == 'div':
                 # Method 1: Has role='article'
-                if current.get('role') == 'article':
-                    return current
+                if ancestor.get('role') == 'article':
+                    return ancestor
                 
-                # Method 2: Contains sufficient structure (header + content)
-                has_header = current.find(['h3', 'h4']) is not None
-                text_length = len(current.get_text(strip=True))
-                
-                # A post container should have a header and decent content
-                if has_header and text_length > 100:
-                    return current
+                # Method 2: A post container should have a header and decent content
+                # (header test first; text is only counted up to the threshold)
+                if HEADER_XPATH(ancestor) and has_text_over(ancestor, 100):
+                    return ancestor
         
         return None
     
     def _extract_author(self, container) -> Optional[str]:
         """Extract author name from post container."""
         # Look for h3/h4 (most reliable)
-        for header in container.find_all(['h3', 'h4']):
-            h_text = header.get_text(strip=True)
+        for header in HEADER_XPATH(container):
+            h_text = element_text(header, '')
             
             if not h_text or len(h_text) < 2:
                 continue
             
             # Skip UI noise
-            ui_noise = ['notification', 'sophie', 'filters', 'all', 'see', 'new', 'earlier', 
-                        'like', 'share', 'comment', 'sponsored', 'search']
-            if any(noise in h_text.lower() for noise in ui_noise):
+            if _UI_NOISE_RE.search(h_text):
                 continue
             
             # Split on middot and take first part
             author = h_text.split('·')[0].strip()
             
             # Remove status patterns
-            status_patterns = [
-                r'feeling \w+\.?$', r'is at .*$', r'is with .*$',
-                r'was live\.?$', r'added \d+ .*$', r'shared a .*$',
-                r'Verified account$', r'Verified$', r'Follow$'
-            ]
-            for pattern in status_patterns:
-                author = re.sub(pattern, '', author, flags=re.IGNORECASE).strip()
-            
-            author = author.rstrip('.')
+            author = _AUTHOR_STATUS_RE.sub('', author).strip().rstrip('.')
             
             # Validate length
             if 2 <= len(author) <= 60:
@@ -465,16 +729,14 @@ class FacebookSearchScraper:
         
         return None
     
-    def _extract_timestamp(self, container) -> Optional[str]:
-        """Extract timestamp from post container."""
-        text = container.get_text(separator=' ', strip=True)
+    def _extract_timestamp(self, container, text: Optional[str] = None) -> Optional[str]:
+        """Extract timestamp from post container (text: the container's already-extracted text, if any)."""
+        if text is None:
+            text = element_text(container)
         
         # Look for patterns like "1h", "2d", "Just now", etc.
-        patterns = [r'\b\d+[hdmw]\b', r'\bJust now\b', r'\bYesterday\b', 
-                   r'\b\d+ hour', r'\b\d+ min', r'\b\d+ day', r'\b\d+ week']
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _TIMESTAMP_RES:
+            match = pattern.search(text)
             if match:
                 return match.group()
         
@@ -488,100 +750,68 @@ class FacebookSearchScraper:
         # ===========================================
         # STEP 1: Remove translation UI elements
         # ===========================================
-        translation_patterns = [
-            r'·?\s*See original\s*·?',
-            r'·?\s*Rate this translation\s*·?',
-            r'·?\s*Translated by\s*·?',
-            r'·?\s*Translate\s*·?',
-            r'·?\s*Auto-translated\s*·?',
-            r'Automatically translated.*?$',
-        ]
-        for pattern in translation_patterns:
-            text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+        for pattern in _TRANSLATION_RES:
+            text = pattern.sub('', text)
         
         # ===========================================
         # STEP 2: Remove Facebook's obfuscated decoy characters
         # These appear as "e S o d o s p n t r 8 l 3..." - single chars with spaces
         # ===========================================
-        # Pattern: sequences of single alphanumeric characters separated by spaces
-        # More than 6 of these in a row is definitely obfuscation
-        text = re.sub(r'(?:\s[a-zA-Z0-9]\s){6,}', ' ', text)
-        text = re.sub(r'(?:^|\s)([a-zA-Z0-9]\s){6,}', ' ', text)
-        
-        # Also remove patterns like "8 l 3 t 0 7" at the start or scattered around
-        text = re.sub(r'\b[0-9]\s+[a-z]\s+[0-9]\s+[a-z]\s+[0-9]\b', '', text, flags=re.IGNORECASE)
-        
-        # Remove random alphanumeric sequence patterns
-        text = re.sub(r'\b[a-z]\s[0-9]\s[a-z]\s[0-9]\s[a-z]\b', '', text, flags=re.IGNORECASE)
+        # Sequences of single alphanumeric characters separated by spaces (more than 6
+        # in a row is definitely obfuscation) plus short chains like "8 l 3 t 0" and
+        # "a 1 b 2 c" - all in one pass
+        text = _DECOY_RE.sub(_decoy_replacement, text)
         
         # ===========================================
         # STEP 3: Remove other UI noise patterns
         # ===========================================
-        noise_patterns = [
-            r'Find friends.*?notifications?',
-            r'Number of unread.*?notifications?',
-            r'Search results',
-            r'Filters\s+All\s+People\s+Reels\s+Marketplace\s+Pages\s+Groups\s+Events',
-            r'(Facebook\s*){3,}',
-            r'Mark as read',
-            r'Earlier\s+Unread',
-            r'Welcome to Facebook!.*?friends\.',
-            r'You might like',
-            r'See all\s+Unread',
-            r'All\s+Unread\s+New',
-            r'Tap here to find people',
-            r'Verified account',
-            r'Click to expand',
-            r'\d+:\d+\s*/\s*\d+:\d+',
-            r'Shared with Public',
-            r'· Follow',
-            r'Notifications\s+',
-            r'All reactions:\s*\d+',
-            r'\d+\s+comments?\s+\d+\s+shares?',
-            r'Like\s+Comment\s+Shar',
-            r'\bSophie\b',
-            r'\bSophie Burns\b',
-            r'Turn on\s+Not now\s+New\s+On Facebook',
-            r'All Unread.*?Turn on.*?Not now',
-            r'See more',
-            r'Fewer bubbles.*?table',  # Part of the garbled example
-            r'\.\.\.·',  # Trailing dots with separator
-        ]
-        
-        for pattern in noise_patterns:
-            text = re.sub(pattern, '', text, flags=re.IGNORECASE)
+        text = _NOISE_RE.sub('', text)
         
         # ===========================================
         # STEP 4: Clean up and normalize
         # ===========================================
         # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = ' '.join(text.split())
         
         # Remove author name prefix if it appears at start
         # e.g. "CNN · President announces..." -> "President announces..."
-        text = re.sub(r'^[A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,2}\s*·\s*', '', text)
+        text = _AUTHOR_PREFIX_RE.sub('', text)
         
         # Remove timestamp prefix
-        text = re.sub(r'^\d+[hdmw]\s*·\s*', '', text)
-        
-        # Remove excessive dots/ellipses
-        text = re.sub(r'\.{3,}', '...', text)
+        text = _TS_PREFIX_RE.sub('', text)
         
-        # Remove patterns like "1RI4GlF2.com" (random gibberish URLs)
-        text = re.sub(r'\b[a-zA-Z0-9]{6,}\.com\b', '', text)
+        # Collapse excessive dots/ellipses and remove gibberish URLs like "1RI4GlF2.com"
+        text = _DOTS_OR_GIBBERISH_RE.sub(_dots_or_gibberish_replacement, text)
         
         # Final cleanup
-        text = re.sub(r'\s+', ' ', text).strip()
-        text = re.sub(r'^·\s*', '', text)  # Remove leading separator
-        text = re.sub(r'\s*·$', '', text)  # Remove trailing separator
+        text = ' '.join(text.split())
+        text = _LEADING_SEP_RE.sub('', text)  # Remove leading separator
+        text = _TRAILING_SEP_RE.sub('', text)  # Remove trailing separator
         
         return text.strip()
     
-    def search_all_keywords(self, keywords: List[str]) -> List[Dict]:
-        """Search all keywords and return combined results."""
+    def search_all_keywords(self, keywords: List[str], workers: int = SCRAPER_WORKERS) -> List[Dict]:
+        """
+        Search all keywords and return combined results.
+        With workers > 1 the keywords are split across a process pool, one
+        headless Chrome per process (Selenium drivers are not thread-safe).
+        """
         if not keywords:
             return []
         
+        workers = min(workers, MAX_SEARCH_PROCESSES, len(keywords))
+        if workers <= 1:
+            return self._search_sequentially(keywords)
+        
+        chunks = [keywords[i::workers] for i in range(workers)]
+        all_posts = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for posts in executor.map(_search_worker, chunks, [self.cookies_file] * workers, range(workers)):
+                all_posts.extend(posts)
+        return all_posts
+    
+    def _search_sequentially(self, keywords: List[str]) -> List[Dict]:
+        """Search keywords one by one in this scraper's browser."""
         all_posts = []
         
         for keyword in keywords:
@@ -597,6 +827,17 @@ class FacebookSearchScraper:
         return all_posts
 
 
+def _search_worker(keywords: List[str], cookies_file: str, cache_slot: int) -> List[Dict]:
+    """Process-pool entry point: search a chunk of keywords in a dedicated browser."""
+    scraper = FacebookSearchScraper(cookies_file, cache_slot)
+    if not scraper.start_browser():
+        return []
+    try:
+        return scraper._search_sequentially(keywords)
+    finally:
+        scraper.close_browser()
+
+
 if __name__ == "__main__":
     print("=== Facebook Search Scraper Test (Fixed URL Boundaries) ===\n")
     
@@ -1,42 +1,181 @@
 # Telegram Notifier - Send keyword match alerts to Telegram group
 
+import asyncio
+import hashlib
+from collections import OrderedDict
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
-from typing import Dict, List, Optional
-import html
+import queue
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import json
 from url_cleaner import clean_facebook_url, clean_html_entities
 
+# Faster JSON encoding when available
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Telegram's hard cap on sendMessage text length
+MAX_MESSAGE_LENGTH = 4096
+ALERT_SEPARATOR = "\n\n---\n\n"
+
+# Same output as html.escape(), done in one C-level pass
+_HTML_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+})
+
+# Token bucket for outgoing messages: Telegram allows about one message per
+# second to the same chat, with short bursts tolerated
+SEND_RATE = 1.0  # tokens added per second
+SEND_BURST = 3   # bucket capacity
+SEND_QUEUE_SIZE = 1000
+
+# How many alerted post URLs to remember for duplicate suppression
+ALERTED_URLS_MAX = 4096
+
+
+def _json_body(payload: Dict) -> bytes:
+    """Encode a Bot API request body, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode('utf-8')
+
+
 class TelegramNotifier:
     """Sends formatted alerts to a Telegram group."""
     
+    JSON_HEADERS = {"Content-Type": "application/json"}
+    
     def __init__(self, bot_token: str, chat_id: str):
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.base_url = f"https://api.telegram.org/bot{bot_token}"
-        self.last_send_time = 0
-        self.min_interval = 1.0  # Min seconds between messages (rate limiting)
+        
+        # Reuse one keep-alive connection pool for all API calls. sendMessage isn't
+        # idempotent, so only retry when the message can't have been delivered: failed
+        # connects and 429 rate limits (honouring Telegram's Retry-After). Read errors
+        # and 5xx responses are not retried.
+        self.session = requests.Session()
+        retries = Retry(
+            total=3,
+            connect=3,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=(429,),
+            allowed_methods=frozenset({"POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries))
+        
+        # Keyword alerts arriving within batch_window seconds are sent as one message
+        self.batch_window = 0.5
+        self._pending: List[Tuple[str, Optional[bytes]]] = []  # (message, post URL digest)
+        self._pending_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        
+        # Digests of post URLs alerted on successfully, oldest first (LRU), and of those
+        # whose alert is still queued or being sent
+        self._alerted: "OrderedDict[bytes, None]" = OrderedDict()
+        self._in_flight: Set[bytes] = set()
+        
+        # Messages are sent by a background thread so callers never wait on rate limiting
+        self._q: queue.Queue = queue.Queue(maxsize=SEND_QUEUE_SIZE)
+        self._capacity = float(SEND_BURST)
+        self._rate = SEND_RATE
+        self._tokens = self._capacity
+        self._last_refill = time.monotonic()
+        self._bucket_lock = threading.Lock()
+        threading.Thread(target=self._worker, daemon=True).start()
+        
+        # aiohttp session for send_message_async, opened on first use inside the caller's event loop
+        self._http_session: Optional[aiohttp.ClientSession] = None
+    
+    def _reserve_token(self) -> float:
+        """Take one token from the bucket; returns how long to wait before it may be used.
+        The bucket may go negative, so concurrent callers queue up behind one another."""
+        with self._bucket_lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._rate)
+            self._last_refill = now
+            self._tokens -= 1
+            return -self._tokens / self._rate if self._tokens < 0 else 0.0
     
-    def _rate_limit(self):
-        """Ensure we don't exceed Telegram rate limits."""
-        elapsed = time.time() - self.last_send_time
-        if elapsed < self.min_interval:
-            time.sleep(self.min_interval - elapsed)
-        self.last_send_time = time.time()
+    def _consume_token(self):
+        """Take one token from the bucket, sleeping until it is usable."""
+        delay = self._reserve_token()
+        if delay:
+            time.sleep(delay)
+    
+    async def _consume_token_async(self):
+        """Take one token from the bucket, yielding to the event loop while waiting."""
+        delay = self._reserve_token()
+        if delay:
+            await asyncio.sleep(delay)
+    
+    def _worker(self):
+        """Send queued messages one by one, throttled by the token bucket."""
+        while True:
+            text, parse_mode, disable_preview, keys = self._q.get()
+            sent = False
+            try:
+                self._consume_token()
+                sent = self._post(text, parse_mode, disable_preview)
+            except Exception as e:
+                # Keep the sender alive (close() waits on the queue); drop just this message
+                print(f"[TELEGRAM] Unexpected error sending message: {e}")
+            finally:
+                self._settle(keys, sent)
+                self._q.task_done()
+    
+    def _settle(self, keys: Iterable[bytes], sent: bool):
+        """Finish the alerts behind a message: remember their post URLs only if it was sent."""
+        with self._pending_lock:
+            for key in keys:
+                self._in_flight.discard(key)
+                if sent:
+                    self._alerted[key] = None
+                    self._alerted.move_to_end(key)
+            while len(self._alerted) > ALERTED_URLS_MAX:
+                self._alerted.popitem(last=False)
+    
+    def _submit(self, text: str, keys: Tuple[bytes, ...] = (), parse_mode: str = "HTML",
+                disable_preview: bool = True) -> bool:
+        """Queue a message for the sender thread. Returns False if the send queue is full."""
+        try:
+            self._q.put_nowait((text, parse_mode, disable_preview, keys))
+            return True
+        except queue.Full:
+            print(f"[TELEGRAM] Send queue full, dropping message")
+            self._settle(keys, False)
+            return False
     
     def send_message(self, text: str, parse_mode: str = "HTML", disable_preview: bool = True) -> bool:
-        """Send a message to the configured chat."""
-        self._rate_limit()
-        
+        """Queue a message for the configured chat. Returns False if the send queue is full."""
+        return self._submit(text, (), parse_mode, disable_preview)
+    
+    def _post(self, text: str, parse_mode: str = "HTML", disable_preview: bool = True) -> bool:
+        """Send a message to the configured chat right away."""
         url = f"{self.base_url}/sendMessage"
-        payload = {
+        body = _json_body({
             "chat_id": self.chat_id,
             "text": text,
             "parse_mode": parse_mode,
             "disable_web_page_preview": disable_preview
-        }
+        })
         
         try:
-            response = requests.post(url, json=payload, timeout=30)
+            response = self.session.post(url, data=body, headers=self.JSON_HEADERS, timeout=30)
             response.raise_for_status()
             result = response.json()
             
@@ -51,43 +190,134 @@ class TelegramNotifier:
             print(f"[TELEGRAM] Request failed: {e}")
             return False
     
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        """Shared aiohttp session for async sends (keeps connections alive between messages)"""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=8, ttl_dns_cache=300, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+        return self._http_session
+    
+    async def send_message_async(self, text: str, parse_mode: str = "HTML", disable_preview: bool = True) -> bool:
+        """Send a message to the configured chat without blocking the event loop; concurrent sends overlap."""
+        await self._consume_token_async()
+        
+        url = f"{self.base_url}/sendMessage"
+        body = _json_body({
+            "chat_id": self.chat_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "disable_web_page_preview": disable_preview
+        })
+        
+        try:
+            async with self._get_http_session().post(url, data=body, headers=self.JSON_HEADERS) as response:
+                result = await response.json(content_type=None)
+            
+            if result.get("ok"):
+                print(f"[TELEGRAM] Message sent successfully")
+                return True
+            else:
+                print(f"[TELEGRAM] API Error: {result.get('description', 'Unknown error')}")
+                return False
+                
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"[TELEGRAM] Request failed: {e}")
+            return False
+    
+    async def aclose(self):
+        """Close the aiohttp session used by send_message_async."""
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+    
+    def _enqueue(self, message: str, key: Optional[bytes] = None):
+        """Queue an alert and schedule a flush at the end of the batch window."""
+        with self._pending_lock:
+            self._pending.append((message, key))
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.batch_window, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def flush(self) -> bool:
+        """Hand all pending alerts to the sender now, packed into as few messages as fit Telegram's length limit."""
+        with self._pending_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            pending, self._pending = self._pending, []
+        
+        # Pack whole alerts greedily so no HTML tag is split across messages
+        chunks = []
+        current = ""
+        current_keys: List[bytes] = []
+        for message, key in pending:
+            if current and len(current) + len(ALERT_SEPARATOR) + len(message) > MAX_MESSAGE_LENGTH:
+                chunks.append((current, tuple(current_keys)))
+                current = message
+                current_keys = []
+            else:
+                current = f"{current}{ALERT_SEPARATOR}{message}" if current else message
+            if key is not None:
+                current_keys.append(key)
+        if current:
+            chunks.append((current, tuple(current_keys)))
+        
+        ok = True
+        for chunk, keys in chunks:
+            ok = self._submit(chunk, keys) and ok
+        return ok
+    
+    def close(self):
+        """Send any queued alerts and wait for them to go out, then close the HTTP session's pooled connections."""
+        self.flush()
+        self._q.join()
+        self.session.close()
+    
     def send_keyword_alert(self, post: Dict, matched_keywords: List[str]) -> bool:
         """
-        Send a formatted alert for a Facebook post with matched keywords.
+        Queue a formatted alert for a Facebook post with matched keywords.
+        Alerts are batched for batch_window seconds, then sent together (see flush()).
+        Posts whose URL was already alerted on recently, or is still queued, are skipped;
+        a URL is remembered only once its alert has actually been sent.
         
         Expected post dict keys:
         - text: str (the post content)
         - post_url: str (link to the post, may be None)
         - timestamp: str (when the post was made, may be None)
         """
-        # Escape HTML entities - handle None values
-        raw_text = post.get("text") or "No text available"
-        text = html.escape(clean_html_entities(str(raw_text))[:800])
-        keywords_str = ", ".join(matched_keywords)
-        
-        # Build the message (no author, no emojis)
-        message_lines = [
-            f"<b>KEYWORD ALERT</b>",
-            f"",
-            f"<b>Keyword:</b> <code>{keywords_str}</code>",
-            f"",
-            f"<b>Post:</b>",
-            f"<i>{text}</i>",
-        ]
-        
-        # Add post URL if available
         post_url = clean_facebook_url(post.get("post_url")) if post.get("post_url") else None
+        
+        # Skip posts already alerted on (re-discovered on a later poll)
+        key = None
         if post_url:
-            message_lines.append(f"")
-            message_lines.append(f"<a href=\"{post_url}\">View Post</a>")
+            key = hashlib.blake2b(post_url.encode('utf-8'), digest_size=16).digest()
+            with self._pending_lock:
+                if key in self._alerted:
+                    self._alerted.move_to_end(key)
+                    return True
+                if key in self._in_flight:
+                    return True
+                self._in_flight.add(key)
         
-        # Add timestamp if available
+        # Escape HTML entities - handle None values. Truncate before cleaning so long posts
+        # aren't scanned in full; the 2x headroom covers text removed by cleaning
+        raw_text = post.get("text") or "No text available"
+        text = clean_html_entities(str(raw_text)[:1600])[:800].translate(_HTML_ESCAPE_TABLE)
+        keywords_str = ", ".join(matched_keywords)
         timestamp = post.get("timestamp")
-        if timestamp:
-            message_lines.append(f"Time: {html.escape(str(timestamp))}")
         
-        message = "\n".join(message_lines)
-        return self.send_message(message)
+        # Build the message (no author, no emojis); link and time only when available
+        message = (
+            f"<b>KEYWORD ALERT</b>\n\n"
+            f"<b>Keyword:</b> <code>{keywords_str}</code>\n\n"
+            f"<b>Post:</b>\n<i>{text}</i>"
+            + (f'\n\n<a href="{post_url}">View Post</a>' if post_url else "")
+            + (f"\nTime: {str(timestamp).translate(_HTML_ESCAPE_TABLE)}" if timestamp else "")
+        )
+        self._enqueue(message, key)
+        return True
     
     def send_startup_notification(self, pages_count: int, keywords_count: int):
         """Send a notification when the monitor starts."""
@@ -101,12 +331,13 @@ class TelegramNotifier:
     
     def send_error_notification(self, error_message: str):
         """Send an error notification."""
-        message = f"⚠️ <b>Facebook Monitor Error</b>\n\n<code>{html.escape(error_message)}</code>"
+        message = f"⚠️ <b>Facebook Monitor Error</b>\n\n<code>{error_message.translate(_HTML_ESCAPE_TABLE)}</code>"
         return self.send_message(message)
     
     def test_connection(self) -> bool:
-        """Test if the bot can send messages to the chat."""
-        return self.send_message("🧪 Facebook Monitor - Connection Test Successful!")
+        """Test if the bot can send messages to the chat (sent synchronously)."""
+        self._consume_token()
+        return self._post("🧪 Facebook Monitor - Connection Test Successful!")
 
 
 if __name__ == "__main__":
@@ -128,9 +359,11 @@ if __name__ == "__main__":
             "timestamp": "2 hours ago"
         }
         
-        if notifier.send_keyword_alert(test_post, ["bitcoin", "cryptocurrency"]):
-            print("✓ Test alert sent!")
+        notifier.send_keyword_alert(test_post, ["bitcoin", "cryptocurrency"])
+        if notifier.flush():
+            print("✓ Test alert queued!")
         else:
-            print("✗ Failed to send test alert")
+            print("✗ Failed to queue test alert")
+        notifier.close()
     else:
         print("✗ Connection failed. Check your bot token and chat ID.")
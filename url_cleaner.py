@@ -1,9 +1,50 @@
 # URL Cleaner - Remove Facebook tracking parameters and clean URLs
 
+import html
 import re
-from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-
-
+from functools import lru_cache
+
+# Facebook/analytics tracking parameters to remove: exact names, plus the
+# Facebook internals that come with suffixes like __cft__[0]
+_EXACT_TRACKING = frozenset({
+    'fbclid',
+    'ref',
+    'refid',
+    'refsrc',
+    'source',
+    'utm_source',
+    'utm_medium',
+    'utm_campaign',
+    'utm_content',
+    'utm_term',
+})
+_PREFIX_TRACKING_RE = re.compile(
+    r'(?:__cft__|__tn__|__xts__|__dyn__|__csr__|__req__|__hs__|__hssc__|__hsfp__|__hstc__)'
+)
+
+# Tracking fragments that leak into post text (bare &__xxx__ params and
+# whole tracking URLs), matched in a single pass, and whitespace runs
+_NOISE_RE = re.compile(
+    r'https?://\S*[?&](?:__cft__|__tn__)\S*'
+    r'|&(?:__cft__\[0\]|__tn__|__xts__\[0\])=[^&\s]*'
+)
+_WS_RE = re.compile(r'\s+')
+
+# Regex-only fallback for URLs the query splitter can't handle: drop the
+# tracking params, then repair the separators they leave behind
+_FB_FALLBACK_RE = re.compile(r'[?&](?:__cft__\[0\]|__tn__|__xts__\[0\]|fbclid)=[^&#]*')
+_SEPARATORS_RE = re.compile(r'[?&]+')
+
+
+def _separator_replacement(match) -> str:
+    """Drop dangling separators; the first remaining one must be '?', the rest '&'."""
+    if match.end() == len(match.string) or match.string[match.end()] == '#':
+        return ''
+    before = match.string[:match.start()]
+    return '&' if '?' in before or '&' in before else '?'
+
+
+@lru_cache(maxsize=4096)
 def clean_facebook_url(url: str) -> str:
     """
     Clean Facebook URLs by removing tracking parameters.
@@ -11,163 +52,43 @@ def clean_facebook_url(url: str) -> str:
     """
     if not url:
         return url
-
-    try:
-        parsed = urlparse(url)
-        query_params = parse_qs(parsed.query, keep_blank_values=True)
-
-        tracking_params = [
-            "__cft__",
-            "__tn__",
-            "__xts__",
-            "__dyn__",
-            "__csr__",
-            "__req__",
-            "__hs__",
-            "__hssc__",
-            "__hsfp__",
-            "__hstc__",
-            "fbclid",
-            "ref",
-            "refid",
-            "refsrc",
-            "source",
-            "utm_source",
-            "utm_medium",
-            "utm_campaign",
-            "utm_content",
-            "utm_term",
-        ]
-
-        cleaned_params = {
-            k: v
-            for k, v in query_params.items()
-            if not any(track in k.lower() for track in tracking_params)
-        }
-
-        cleaned_query = urlencode(cleaned_params, doseq=True)
-        cleaned_parsed = parsed._replace(query=cleaned_query)
-        cleaned_url = urlunparse(cleaned_parsed)
-
-        if cleaned_url.endswith("?"):
-            cleaned_url = cleaned_url[:-1]
-
-        return cleaned_url
-
-    except Exception:
-        # If parsing fails, try simple regex cleanup
-        cleaned = re.sub(r"[?&]__cft__\[0\]=[^&]*", "", url)
-        cleaned = re.sub(r"[?&]__tn__=[^&]*", "", cleaned)
-        cleaned = re.sub(r"[?&]__xts__\[0\]=[^&]*", "", cleaned)
-        cleaned = re.sub(r"[?&]fbclid=[^&]*", "", cleaned)
-
-        cleaned = re.sub(r"[&?]+", lambda m: "&" if "&" in m.group() else "?", cleaned)
-        cleaned = re.sub(r"\?&", "?", cleaned)
-        cleaned = re.sub(r"&$", "", cleaned)
-        cleaned = re.sub(r"\?$", "", cleaned)
-
-        return cleaned
-
-
-def clean_html_entities(text: str) -> str:
-    """
-    Clean HTML entities and decode them properly.
-    Also removes common Facebook UI noise.
-    """
-    if not text:
-        return text
-
-    import html
-
-    text = html.unescape(text)
-
-    text = re.sub(r"&__cft__\[0\]=[^\s]*", "", text)
-    text = re.sub(r"&__tn__=[^\s]*", "", text)
-    text = re.sub(r"&__xts__\[0\]=[^\s]*", "", text)
-
-    text = re.sub(r"https?://[^\s]*[?&]__cft__[^\s]*", "", text)
-    text = re.sub(r"https?://[^\s]*[?&]__tn__[^\s]*", "", text)
-
-    text = re.sub(r"\s+", " ", text).strip()
-
-    return text
-# URL Cleaner - Remove Facebook tracking parameters and clean URLs
-
-import re
-from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-
-
-def clean_facebook_url(url: str) -> str:
-    """
-    Clean Facebook URLs by removing tracking parameters.
-    Removes parameters like __cft__, __tn__, etc.
-    """
-    if not url:
+    
+    # Nothing to strip without a query string
+    if url.find('?') == -1:
         return url
     
     try:
-        # Parse the URL
-        parsed = urlparse(url)
-        
-        # Parse query parameters
-        query_params = parse_qs(parsed.query, keep_blank_values=True)
-        
-        # List of Facebook tracking parameters to remove
-        tracking_params = [
-            '__cft__',
-            '__tn__',
-            '__xts__',
-            '__dyn__',
-            '__csr__',
-            '__req__',
-            '__hs__',
-            '__hssc__',
-            '__hsfp__',
-            '__hstc__',
-            'fbclid',
-            'ref',
-            'refid',
-            'refsrc',
-            'source',
-            'utm_source',
-            'utm_medium',
-            'utm_campaign',
-            'utm_content',
-            'utm_term',
-        ]
+        # Split off the fragment, then the query string
+        base, hash_sep, fragment = url.partition('#')
+        path, query_sep, query = base.partition('?')
+        if not query_sep:
+            return url
         
-        # Remove tracking parameters
-        cleaned_params = {k: v for k, v in query_params.items() 
-                         if not any(track in k.lower() for track in tracking_params)}
+        # Keep the raw key=value pairs whose key is not a tracking parameter
+        kept = []
+        for pair in query.split('&'):
+            if not pair:
+                continue
+            k = pair.split('=', 1)[0]
+            if k not in _EXACT_TRACKING and not _PREFIX_TRACKING_RE.match(k):
+                kept.append(pair)
         
-        # Rebuild URL without tracking parameters
-        cleaned_query = urlencode(cleaned_params, doseq=True)
-        cleaned_parsed = parsed._replace(query=cleaned_query)
-        cleaned_url = urlunparse(cleaned_parsed)
-        
-        # Remove trailing ? if no query params
-        if cleaned_url.endswith('?'):
-            cleaned_url = cleaned_url[:-1]
+        # Rebuild URL without tracking parameters (and without a bare ?)
+        cleaned_url = path
+        if kept:
+            cleaned_url += '?' + '&'.join(kept)
+        if hash_sep:
+            cleaned_url += '#' + fragment
         
         return cleaned_url
         
-    except Exception as e:
-        # If parsing fails, try simple regex cleanup
-        # Remove common tracking patterns
-        cleaned = re.sub(r'[?&]__cft__\[0\]=[^&]*', '', url)
-        cleaned = re.sub(r'[?&]__tn__=[^&]*', '', cleaned)
-        cleaned = re.sub(r'[?&]__xts__\[0\]=[^&]*', '', cleaned)
-        cleaned = re.sub(r'[?&]fbclid=[^&]*', '', cleaned)
-        
-        # Clean up multiple consecutive & or ?
-        cleaned = re.sub(r'[&?]+', lambda m: '&' if '&' in m.group() else '?', cleaned)
-        cleaned = re.sub(r'\?&', '?', cleaned)
-        cleaned = re.sub(r'&$', '', cleaned)
-        cleaned = re.sub(r'\?$', '', cleaned)
-        
-        return cleaned
+    except Exception:
+        # If splitting fails, fall back to a regex cleanup of the common tracking patterns
+        cleaned = _FB_FALLBACK_RE.sub('', url)
+        return _SEPARATORS_RE.sub(_separator_replacement, cleaned)
 
 
+@lru_cache(maxsize=4096)
 def clean_html_entities(text: str) -> str:
     """
     Clean HTML entities and decode them properly.
@@ -176,22 +97,15 @@ def clean_html_entities(text: str) -> str:
     if not text:
         return text
     
-    import html
-    
     # Decode HTML entities
     text = html.unescape(text)
     
-    # Remove common Facebook tracking patterns that might leak into text
-    text = re.sub(r'&__cft__\[0\]=[^&\s]*', '', text)
-    text = re.sub(r'&__tn__=[^&\s]*', '', text)
-    text = re.sub(r'&__xts__\[0\]=[^&\s]*', '', text)
-    
-    # Remove URL fragments that might appear in text
-    text = re.sub(r'https?://[^\s]*[?&]__cft__[^\s]*', '', text)
-    text = re.sub(r'https?://[^\s]*[?&]__tn__[^\s]*', '', text)
+    # Remove Facebook tracking params and URLs that might leak into text
+    if '&__' in text or 'http' in text:
+        text = _NOISE_RE.sub('', text)
     
     # Clean up excessive whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _WS_RE.sub(' ', text).strip()
     
     return text
 